@@ -1,6 +1,6 @@
 {
     'name': 'DynaMed',
-    'version': '1.0',
+    'version': '1.1',
     'summary': 'Module de gestion des patients, médecins, cliniques et consultations',
     'description': 'Module pour gérer les patients, médecins, cliniques et consultations',
     'author': 'Votre Nom',
@@ -13,6 +13,7 @@
         'security/record_rules.xml',
 
         'data/ir_cron.xml',
+        'data/consultation_stat_data.xml',
         'data/mail_trial_templates.xml',
         'data/mail_confirm_payment.xml',
         'data/mail_payment_rejected_template.xml',
@@ -42,6 +43,7 @@
         'views/website_payment_template.xml',
         'views/molecule_views.xml',
         'views/dataset_views.xml',
+        'views/perf_sample_views.xml',
         #'views/dynamed_dashboard.xml',
         'views/menu_items.xml',
     ],
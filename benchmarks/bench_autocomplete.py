@@ -0,0 +1,93 @@
+"""Benchmark de l'autocomplétion des molécules et noms commerciaux (``autocomplete``).
+
+Nécessite une base Odoo avec le module installé (et l'extension pg_trgm pour l'index
+trigramme). Le catalogue synthétique est créé dans une transaction annulée à la fin :
+la base n'est pas modifiée.
+
+    python benchmarks/bench_autocomplete.py -c odoo.conf -d dynamed --names 100000 --queries 500
+"""
+import argparse
+import random
+import statistics
+import time
+
+import odoo
+from odoo.tools import config
+
+SYLLABLES = ['amo', 'xi', 'cil', 'lin', 'pa', 'ra', 'cé', 'ta', 'mol', 'ibu', 'pro', 'fène',
+             'mé', 'tfor', 'mine', 'clo', 'pi', 'do', 'grel', 'oméprazole', 'é', 'thy', 'rox', 'ine']
+
+
+def make_names(count, seed=42):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        names.add(''.join(rng.sample(SYLLABLES, rng.randint(2, 4))).capitalize() + f' {rng.randint(1, 999)}')
+    return sorted(names)
+
+
+def make_queries(names, count, seed=7):
+    """Préfixes et fragments, parfois sans accents ou en majuscules, comme une saisie réelle"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        start = rng.choice([0, 0, rng.randint(0, max(len(name) - 4, 0))])
+        query = name[start:start + rng.randint(3, 6)]
+        if rng.random() < 0.3:
+            query = query.replace('é', 'e').replace('è', 'e')
+        if rng.random() < 0.3:
+            query = query.upper()
+        queries.append(query)
+    return queries
+
+
+def percentile(values, ratio):
+    values = sorted(values)
+    return values[min(int(len(values) * ratio), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-c', '--config', required=True, help='fichier de configuration Odoo')
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--names', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    config.parse_config(['-c', args.config, '-d', args.database])
+    registry = odoo.registry(args.database)
+    with registry.cursor() as cr:
+        env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+        try:
+            names = make_names(args.names)
+            Molecule = env['dynamed.molecule']
+            start = time.perf_counter()
+            for i in range(0, len(names), 10000):
+                Molecule.create([{'name': name} for name in names[i:i + 10000]])
+            env.flush_all()
+            cr.execute("ANALYZE dynamed_molecule")
+            print(f"catalogue : {len(names)} noms créés en {time.perf_counter() - start:.1f} s "
+                  f"(index trigramme : {'oui' if registry.has_trigram else 'non'})")
+
+            queries = make_queries(names, args.queries)
+            for label, search in (
+                ('autocomplete', lambda query: Molecule.autocomplete(query, limit=args.limit)),
+                ('name ilike', lambda query: Molecule.search_read(
+                    [('name', 'ilike', query)], ['name'], limit=args.limit)),
+            ):
+                durations = []
+                for query in queries:
+                    env.invalidate_all()
+                    begin = time.perf_counter()
+                    search(query)
+                    durations.append((time.perf_counter() - begin) * 1000)
+                print(f"{label:>13} : médiane {statistics.median(durations):.2f} ms, "
+                      f"p95 {percentile(durations, 0.95):.2f} ms, max {max(durations):.2f} ms")
+        finally:
+            cr.rollback()
+
+
+if __name__ == '__main__':
+    main()
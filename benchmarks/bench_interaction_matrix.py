@@ -0,0 +1,88 @@
+"""Benchmark de la matrice d'interactions d'une ordonnance (``get_interaction_matrix``).
+
+Nécessite une base Odoo avec le module installé. Les molécules et interactions de test
+sont créées dans une transaction annulée à la fin : la base n'est pas modifiée.
+
+    python benchmarks/bench_interaction_matrix.py -c odoo.conf -d dynamed --molecules 50
+"""
+import argparse
+import random
+import statistics
+import time
+
+import odoo
+from odoo.tools import config
+
+
+def make_dataset(env, molecules, density, seed=42):
+    """Crée ``molecules`` molécules et des interactions pour ``density`` des paires"""
+    rng = random.Random(seed)
+    molecule_ids = env['dynamed.molecule'].create([
+        {'name': f'Bench molécule {i:03d}'} for i in range(molecules)
+    ]).ids
+    env['dynamed.interaction'].create([
+        {'medicament_1_id': a, 'medicament_2_id': b, 'type_interaction': 'Contre-indiquée'}
+        for i, a in enumerate(molecule_ids)
+        for b in molecule_ids[i + 1:]
+        if rng.random() < density
+    ])
+    env.invalidate_all()
+    return molecule_ids
+
+
+def per_pair(env, molecule_ids):
+    """Ancien comportement : une recherche par paire de molécules"""
+    Interaction = env['dynamed.interaction']
+    found = 0
+    for i, a in enumerate(molecule_ids):
+        for b in molecule_ids[i + 1:]:
+            found += bool(Interaction.search([
+                '|',
+                '&', ('medicament_1_id', '=', a), ('medicament_2_id', '=', b),
+                '&', ('medicament_1_id', '=', b), ('medicament_2_id', '=', a),
+            ], limit=1))
+    return found
+
+
+def matrix(env, molecule_ids):
+    return len(env['dynamed.prescription'].get_interaction_matrix(molecule_ids)['interactions'])
+
+
+def measure(env, function, molecule_ids, repeat):
+    durations = []
+    for _ in range(repeat):
+        env.invalidate_all()
+        queries = env.cr.sql_log_count
+        start = time.perf_counter()
+        found = function(env, molecule_ids)
+        durations.append(time.perf_counter() - start)
+        queries = env.cr.sql_log_count - queries
+    return found, queries, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-c', '--config', required=True, help='fichier de configuration Odoo')
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--molecules', type=int, default=50)
+    parser.add_argument('--density', type=float, default=0.1, help='proportion des paires en interaction')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    config.parse_config(['-c', args.config, '-d', args.database])
+    registry = odoo.registry(args.database)
+    with registry.cursor() as cr:
+        env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+        try:
+            molecule_ids = make_dataset(env, args.molecules, args.density)
+            for label, function in (('par paire', per_pair), ('matrice', matrix)):
+                found, queries, durations = measure(env, function, molecule_ids, args.repeat)
+                print(f"{label:>10} : {found} interactions, {queries} requêtes, "
+                      f"médiane {statistics.median(durations) * 1000:.1f} ms, "
+                      f"max {max(durations) * 1000:.1f} ms")
+        finally:
+            cr.rollback()
+
+
+if __name__ == '__main__':
+    main()
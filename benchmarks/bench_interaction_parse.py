@@ -0,0 +1,73 @@
+"""Benchmark de l'analyse des fichiers d'interactions (``tools/interaction_parse.py``).
+
+Ne nécessite pas Odoo : génère un fichier d'interactions synthétique, puis compare
+l'analyse séquentielle et l'analyse en pool de processus.
+
+    python benchmarks/bench_interaction_parse.py --pairs 1000000 --workers 4
+"""
+import argparse
+import importlib.util
+import pathlib
+import random
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def load_parser():
+    spec = importlib.util.spec_from_file_location(
+        'interaction_parse', ROOT / 'tools' / 'interaction_parse.py'
+    )
+    module = importlib.util.module_from_spec(spec)
+    # Enregistré pour que le pool de processus puisse sérialiser ses fonctions
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate_rows(pairs, per_row, molecules, classes, seed=42):
+    """Lignes ``(médicament 1, classe, médicaments, type)`` totalisant ``pairs`` paires"""
+    rng = random.Random(seed)
+    names = [f'Molécule {i:06d}' for i in range(molecules)]
+    class_names = [f'Classe {i:03d}' for i in range(classes)]
+    rows = []
+    for _ in range(pairs // per_row):
+        rows.append((
+            rng.choice(names),
+            rng.choice(class_names),
+            ' - '.join(rng.sample(names, per_row)),
+            rng.choice(['Contre-indiquée', 'Déconseillée', 'Précaution d\'emploi']),
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pairs', type=int, default=1000000)
+    parser.add_argument('--per-row', type=int, default=20)
+    parser.add_argument('--molecules', type=int, default=20000)
+    parser.add_argument('--classes', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=0, help='0 : un processus par CPU')
+    args = parser.parse_args()
+
+    interaction_parse = load_parser()
+    rows = generate_rows(args.pairs, args.per_row, args.molecules, args.classes)
+    print(f"{len(rows)} lignes, {len(rows) * args.per_row} paires")
+
+    results = {}
+    for label, workers in (('séquentiel', 1), ('parallèle', args.workers)):
+        start = time.perf_counter()
+        with interaction_parse.interaction_parser(workers, len(rows)) as parse:
+            interactions, medicaments, classes = parse(rows)
+        elapsed = time.perf_counter() - start
+        results[label] = interactions
+        print(f"{label:>11} : {elapsed:6.2f} s, {int(len(rows) * args.per_row / elapsed):>9} paires/s, "
+              f"{len(interactions)} interactions, {len(medicaments)} médicaments, {len(classes)} classes")
+
+    assert results['séquentiel'] == results['parallèle'], "Les deux analyses doivent être identiques"
+    assert list(results['séquentiel']) == list(results['parallèle']), "L'ordre du fichier doit être conservé"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark de l'envoi groupé des emails (``dynamed.mail.dispatcher``).
+
+Nécessite une base Odoo avec le module installé. Un serveur SMTP local minimal sert de
+substitut au vrai serveur : il accepte les messages, avec une latence et un taux d'échec
+réglables. Les demandes d'inscription et emails de test sont créés dans une transaction
+annulée à la fin : la base n'est pas modifiée.
+
+    python benchmarks/bench_mail_dispatch.py -c odoo.conf -d dynamed --mails 500 --latency 0.01
+"""
+import argparse
+import random
+import socketserver
+import statistics
+import threading
+import time
+
+import odoo
+from odoo.tools import config
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Serveur SMTP minimal : accepte tout, avec une latence et un taux d'échec donnés"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency=0.0, fail_rate=0.0):
+        super().__init__(address, SMTPHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.connections = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 localhost SMTP stand-in')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].decode(errors='replace').upper()
+            if command == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                time.sleep(server.latency)
+                if random.random() < server.fail_rate:
+                    self.reply('451 Temporary failure')
+                else:
+                    with server.lock:
+                        server.messages += 1
+                    self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-c', '--config', required=True, help='fichier de configuration Odoo')
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--mails', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help='latence du serveur SMTP par message (s)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="proportion de messages refusés")
+    args = parser.parse_args()
+
+    smtp = SMTPStandIn(('127.0.0.1', 0), args.latency, args.fail_rate)
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+
+    config.parse_config(['-c', args.config, '-d', args.database])
+    registry = odoo.registry(args.database)
+    with registry.cursor() as cr:
+        env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+        try:
+            mail_server = env['ir.mail_server'].create({
+                'name': 'SMTP stand-in',
+                'smtp_host': '127.0.0.1',
+                'smtp_port': smtp.server_address[1],
+                'smtp_encryption': 'none',
+                'sequence': 0,
+            })
+            inscriptions = env['dynamed.inscription.medecin'].create([
+                {'name': f'Bench {i:05d}', 'email': f'bench{i:05d}@example.com'}
+                for i in range(args.mails)
+            ])
+            template = env.ref('dynamed.email_template_trial_expired')
+            dispatcher = env['dynamed.mail.dispatcher']
+
+            start = time.perf_counter()
+            mails = dispatcher._queue(template, inscriptions, {'mail_server_id': mail_server.id})
+            queued = time.perf_counter() - start
+
+            # Envoi lot par lot sans valider la transaction (contrairement à _cron_dispatch)
+            sessions = {}
+            report = []
+            for i in range(0, len(mails), args.batch_size):
+                report.append(dispatcher._send_batch(mails[i:i + args.batch_size], mail_server.id, sessions))
+            for session in sessions.values():
+                session.quit()
+
+            latencies = [batch['latency_ms'] for batch in report]
+            print(f"mise en file : {len(mails)} emails en {queued * 1000:.0f} ms")
+            print(f"envoi : {len(report)} lots, {sum(batch['failed'] for batch in report)} échecs, "
+                  f"{smtp.messages} messages reçus sur {smtp.connections} connexion(s)")
+            print(f"latence par lot : médiane {statistics.median(latencies):.0f} ms, max {max(latencies):.0f} ms")
+        finally:
+            cr.rollback()
+            smtp.shutdown()
+
+
+if __name__ == '__main__':
+    main()
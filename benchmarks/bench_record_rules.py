@@ -0,0 +1,113 @@
+"""Benchmark des listes filtrées par les règles d'accès des médecins (``owner_user_id``).
+
+Nécessite une base Odoo avec le module installé. Les médecins, patients, consultations
+et ordonnances de test sont créés dans une transaction annulée à la fin : la base n'est
+pas modifiée.
+
+Compare, pour un médecin, la première page des listes avec la règle actuelle (colonne
+propriétaire indexée) et avec l'ancien filtre (jointure par ``medecin_id.user_id`` et
+``create_uid`` non indexé), appliqué explicitement en superutilisateur.
+
+    python benchmarks/bench_record_rules.py -c odoo.conf -d dynamed --medecins 20 --consultations 50000
+"""
+import argparse
+import random
+import statistics
+import time
+
+import odoo
+from odoo.tools import config
+
+LIST_LIMIT = 80
+
+
+def make_dataset(env, medecins, consultations, seed=42):
+    """Crée les médecins (groupe médecin), leurs patients, consultations et ordonnances"""
+    rng = random.Random(seed)
+    groups = [env.ref('base.group_user').id, env.ref('dynamed.group_dynamed_medecin').id]
+    doctors = env['dynamed.medecin'].create([{
+        'name': f'Dr Bench {i:03d}',
+        'login': f'bench.rules.{i:03d}@example.com',
+        'groups_id': [(6, 0, groups)],
+    } for i in range(medecins)])
+
+    patients_by_doctor = {}
+    for doctor in doctors:
+        patients_by_doctor[doctor] = env['dynamed.patient'].with_user(doctor.user_id).create([
+            {'name': f'Patient {doctor.id}-{i:04d}', 'age': rng.randint(1, 95)}
+            for i in range(max(1, consultations // medecins // 4))
+        ]).ids
+
+    Consultation = env['dynamed.consultation']
+    for i in range(0, consultations, 5000):
+        batch = []
+        for _ in range(min(5000, consultations - i)):
+            doctor = rng.choice(doctors)
+            batch.append({
+                'medecin_id': doctor.id,
+                'patient_id': rng.choice(patients_by_doctor[doctor]),
+                'date_consultation': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+            })
+        created = Consultation.create(batch)
+        env['dynamed.prescription'].create([
+            {'consultation_id': consultation.id} for consultation in created if rng.random() < 0.5
+        ])
+        env.flush_all()
+        env.invalidate_all()
+    for table in ('dynamed_consultation', 'dynamed_prescription', 'dynamed_patient'):
+        env.cr.execute(f'ANALYZE {table}')
+    return doctors
+
+
+def measure(env, function, repeat):
+    durations = []
+    for _ in range(repeat):
+        env.invalidate_all()
+        queries = env.cr.sql_log_count
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+        queries = env.cr.sql_log_count - queries
+    return queries, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-c', '--config', required=True, help='fichier de configuration Odoo')
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--medecins', type=int, default=20)
+    parser.add_argument('--consultations', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    config.parse_config(['-c', args.config, '-d', args.database])
+    registry = odoo.registry(args.database)
+    with registry.cursor() as cr:
+        env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+        try:
+            doctors = make_dataset(env, args.medecins, args.consultations)
+            user = doctors[0].user_id
+            cases = []
+            for model_name, old_domain in (
+                ('dynamed.consultation', [('medecin_id.user_id', '=', user.id)]),
+                ('dynamed.prescription', [('medecin_id.user_id', '=', user.id)]),
+                ('dynamed.patient', [('create_uid', '=', user.id)]),
+            ):
+                Model = env[model_name]
+                fields = ['display_name', 'create_date']
+                cases += [
+                    (f'{model_name} (ancien filtre)', lambda Model=Model, domain=old_domain: (
+                        Model.search_read(domain, fields, limit=LIST_LIMIT), Model.search_count(domain))),
+                    (f'{model_name} (règle)', lambda Model=Model.with_user(user): (
+                        Model.search_read([], fields, limit=LIST_LIMIT), Model.search_count([]))),
+                ]
+            for label, function in cases:
+                queries, durations = measure(env, function, args.repeat)
+                print(f"{label:>38} : {queries} requêtes, médiane {statistics.median(durations) * 1000:.1f} ms, "
+                      f"max {max(durations) * 1000:.1f} ms")
+        finally:
+            cr.rollback()
+
+
+if __name__ == '__main__':
+    main()
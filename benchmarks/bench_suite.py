@@ -0,0 +1,233 @@
+"""Suite de benchmarks des chemins critiques DynaMed, comparée à une référence.
+
+Nécessite une base Odoo avec le module installé. Les données synthétiques
+(``synthetic_data.py``) sont créées dans une transaction annulée à la fin : la base
+n'est pas modifiée. Chaque mesure est exécutée dans un point de sauvegarde annulé
+après coup, caches du registre vidés, de sorte que toutes les répétitions partent du
+même état.
+
+Pour chaque cas sont relevés le nombre de requêtes SQL, le temps (médiane des
+répétitions) et le pic de mémoire Python. ``--save-baseline`` enregistre les résultats
+comme référence ; les exécutions suivantes s'y comparent et se terminent en erreur si
+un cas régresse au-delà de la tolérance.
+
+    python benchmarks/bench_suite.py -c odoo.conf -d dynamed --scale 1 --save-baseline
+    python benchmarks/bench_suite.py -c odoo.conf -d dynamed --scale 1
+"""
+import argparse
+import base64
+import json
+import pathlib
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import odoo
+from odoo.exceptions import UserError
+from odoo.tools import config
+
+import synthetic_data
+
+DEFAULT_BASELINE = pathlib.Path(__file__).resolve().parent / 'baseline.json'
+# Nombre de lignes des fichiers d'import pour scale=1
+IMPORT_ROWS = 1000
+# Nombre de lignes d'ordonnance créées (et vérifiées entre elles) par mesure
+INTERACTION_CHECK_SIZE = 10
+
+
+class Case:
+    """Cas mesuré : ``setup(env)`` prépare (non mesuré) et retourne l'argument de ``run``"""
+
+    def __init__(self, name, run, setup=None):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda env: None)
+
+
+def make_cases(data, rng, scale):
+    import_rows = max(10, int(IMPORT_ROWS * scale))
+
+    def consultation(env):
+        return env['dynamed.consultation'].browse(rng.choice(data['consultations']))
+
+    def stale_consultation(env):
+        # Nouvelle version de la base de connaissances : les recommandations sont à recalculer
+        env['dynamed.knowledge.mixin']._invalidate_knowledge_base()
+        return consultation(env)
+
+    def generate_prescription(consultation):
+        try:
+            consultation.action_generate_prescription()
+        except UserError:
+            # Interaction détectée entre les molécules recommandées : vérification comprise
+            pass
+
+    def prescription_lines(env):
+        prescription = env['dynamed.prescription'].create({'consultation_id': rng.choice(data['consultations'])})
+        return prescription, rng.sample(data['molecules'], INTERACTION_CHECK_SIZE)
+
+    def create_lines(args):
+        prescription, molecule_ids = args
+        try:
+            prescription.env['prescription.molecule.line'].create([
+                {'prescription_id': prescription.id, 'molecule_id': molecule_id} for molecule_id in molecule_ids
+            ])
+        except UserError:
+            # Interaction détectée : la vérification a été faite en entier
+            pass
+
+    def dataset(make_csv, method):
+        def setup(env):
+            return env['dynamed.dataset'].create({
+                'name': f'Bench {method}',
+                'file': base64.b64encode(make_csv(import_rows)),
+                'file_name': f'{method}.csv',
+                'chunk_size': 1000,
+            })
+
+        return Case(method, lambda record: getattr(record, method)(), setup)
+
+    def clear_dashboard_cache(env):
+        from odoo.addons.dynamed.models import dynamed_dashboard
+        dynamed_dashboard._dashboard_cache.clear()
+        return env['dynamed.dashboard']
+
+    return [
+        Case('score_molecules (recalcul)', lambda record: record.score_molecules(limit=10), stale_consultation),
+        Case('score_molecules (enregistré)', lambda record: record.score_molecules(limit=10), consultation),
+        Case('action_generate_prescription', generate_prescription, consultation),
+        Case('prescription.molecule.line create', create_lines, prescription_lines),
+        dataset(synthetic_data.molecules_csv, 'import_molecules_data'),
+        dataset(synthetic_data.precautions_csv, 'import_precautions'),
+        dataset(synthetic_data.diagnostics_csv, 'import_diagnostics_classes'),
+        dataset(synthetic_data.commercial_names_csv, 'import_nom_commercial'),
+        dataset(synthetic_data.interactions_csv, 'import_interactions_data'),
+        Case('get_dashboard_data', lambda Dashboard: Dashboard.get_dashboard_data(), clear_dashboard_cache),
+        Case('check_trial_expiration', lambda Inscription: Inscription.check_trial_expiration(),
+             lambda env: env['dynamed.inscription.medecin']),
+    ]
+
+
+def run_once(env, case, trace=False):
+    """Exécute le cas une fois dans un point de sauvegarde annulé ; retourne ses mesures"""
+    cr = env.cr
+    env.flush_all()
+    cr.execute('SAVEPOINT bench_case')
+    try:
+        argument = case.setup(env)
+        env.flush_all()
+        env.invalidate_all()
+        if trace:
+            tracemalloc.start()
+        queries = cr.sql_log_count
+        start = time.perf_counter()
+        case.run(argument)
+        env.flush_all()
+        elapsed = time.perf_counter() - start
+        queries = cr.sql_log_count - queries
+        peak = tracemalloc.get_traced_memory()[1] if trace else None
+    finally:
+        if trace:
+            tracemalloc.stop()
+        env.invalidate_all(flush=False)
+        cr.execute('ROLLBACK TO SAVEPOINT bench_case')
+        # Les caches du registre (ormcache) ont pu mémoriser des valeurs annulées : les
+        # vider pour que la répétition suivante parte vraiment du même état
+        env.registry.clear_cache()
+        env.invalidate_all()
+    return elapsed, queries, peak
+
+
+def measure(env, case, repeat):
+    # Premier passage sous tracemalloc (pic mémoire, non chronométré : le suivi le ralentit)
+    __, __, peak = run_once(env, case, trace=True)
+    durations, queries = [], []
+    for _ in range(repeat):
+        elapsed, count, __ = run_once(env, case)
+        durations.append(elapsed)
+        queries.append(count)
+    return {
+        'wall_ms': round(statistics.median(durations) * 1000, 2),
+        'queries': max(queries),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Retourne la liste des régressions par rapport à la référence"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for metric, allowed in (
+            ('queries', reference['queries']),
+            ('wall_ms', reference['wall_ms'] * (1 + tolerance)),
+            ('peak_kib', reference['peak_kib'] * (1 + tolerance)),
+        ):
+            if result[metric] > allowed:
+                regressions.append(f"{name} : {metric} {result[metric]} > {reference[metric]} (référence)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-c', '--config', required=True, help='fichier de configuration Odoo')
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--scale', type=float, default=1.0, help='volume des données (1 : cabinet moyen)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help='ne mesurer que les cas dont le nom contient ce texte')
+    parser.add_argument('--baseline', type=pathlib.Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='enregistrer les résultats comme référence')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='dégradation tolérée du temps et de la mémoire (0.25 : +25 %%)')
+    args = parser.parse_args()
+
+    config.parse_config(['-c', args.config, '-d', args.database])
+    registry = odoo.registry(args.database)
+    with registry.cursor() as cr:
+        env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+        try:
+            start = time.perf_counter()
+            data = synthetic_data.make_knowledge_base(env, args.scale, args.seed)
+            synthetic_data.make_practice(env, data, args.scale, args.seed + 1)
+            print(f"données : {len(data['molecules'])} molécules, {len(data['consultations'])} consultations "
+                  f"créées en {time.perf_counter() - start:.1f} s")
+
+            results = {}
+            rng = random.Random(args.seed)
+            for case in make_cases(data, rng, args.scale):
+                if args.only and args.only not in case.name:
+                    continue
+                results[case.name] = result = measure(env, case, args.repeat)
+                print(f"{case.name:>32} : {result['queries']:>6} requêtes, {result['wall_ms']:>9.1f} ms, "
+                      f"pic {result['peak_kib']:>9.1f} Kio")
+        finally:
+            cr.rollback()
+
+    meta = {'scale': args.scale, 'seed': args.seed}
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({'meta': meta, 'results': results}, indent=2, ensure_ascii=False))
+        print(f"référence enregistrée : {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("pas de référence : relancer avec --save-baseline pour en enregistrer une")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline['meta'] != meta:
+        print(f"référence mesurée avec d'autres paramètres ({baseline['meta']}) : comparaison ignorée")
+        return 0
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for regression in regressions:
+        print(f"RÉGRESSION {regression}")
+    if not regressions:
+        print("aucune régression par rapport à la référence")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
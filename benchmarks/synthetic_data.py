@@ -0,0 +1,258 @@
+"""Génération de données cliniques synthétiques pour les benchmarks.
+
+Les volumes sont proportionnels à ``scale`` (1 : un cabinet de taille moyenne, environ un
+millier de molécules et deux mille consultations) et le tirage est déterministe pour une
+graine donnée : deux exécutions avec les mêmes paramètres produisent les mêmes données.
+
+Les fonctions ``make_*`` écrivent dans la base via l'ORM ; les fonctions ``*_csv``
+produisent le contenu des fichiers attendus par les imports de ``dynamed.dataset``.
+"""
+import csv
+import io
+import random
+from datetime import timedelta
+
+from odoo import fields
+
+SYLLABLES = ['amo', 'xi', 'cil', 'lin', 'pa', 'ra', 'cé', 'ta', 'mol', 'ibu', 'pro', 'fène', 'mé',
+             'tfor', 'mine', 'clo', 'pi', 'do', 'grel', 'zé', 'thy', 'rox', 'ine', 'val', 'sar',
+             'tan', 'ate', 'ol', 'pril', 'esom', 'lor', 'azé', 'pam', 'dia', 'zole']
+TERMS = ['aiguë', 'chronique', 'sévère', 'modérée', 'récidivante', 'de l\'adulte', 'de l\'enfant',
+         'post-opératoire', 'allergique', 'infectieuse', 'inflammatoire', 'fonctionnelle']
+ORGANS = ['cardiaque', 'rénale', 'hépatique', 'pulmonaire', 'digestive', 'cutanée', 'articulaire',
+          'urinaire', 'neurologique', 'vasculaire', 'oculaire', 'ORL']
+FORMS = ['Comprimé', 'Gélule', 'Sirop', 'Solution injectable', 'Suppositoire', 'Pommade']
+INTERACTION_TYPES = ['Contre-indiquée', 'Déconseillée', 'Précaution d\'emploi', 'A prendre en compte']
+
+# Volumes pour scale=1
+VOLUMES = {
+    'classes': 40,
+    'allergies': 60,
+    'antecedents': 80,
+    'indications': 150,
+    'precautions': 60,
+    'molecules': 1000,
+    'diagnostics': 300,
+    'medecins': 20,
+    'patients': 500,
+    'consultations': 2000,
+    'trials': 50,
+}
+
+
+def volume(name, scale):
+    return max(1, int(VOLUMES[name] * scale))
+
+
+def molecule_name(rng):
+    return ''.join(rng.sample(SYLLABLES, rng.randint(2, 4))).capitalize()
+
+
+def unique_names(rng, count, make, prefix=''):
+    """``count`` noms distincts produits par ``make(rng)``"""
+    names = {}
+    while len(names) < count:
+        name = f'{prefix}{make(rng)}'
+        if name in names:
+            name = f'{name} {len(names)}'
+        names[name] = True
+    return list(names)
+
+
+def condition_name(rng):
+    return f"{rng.choice(['Insuffisance', 'Infection', 'Douleur', 'Lésion', 'Atteinte', 'Affection'])} " \
+           f"{rng.choice(ORGANS)} {rng.choice(TERMS)}"
+
+
+def sample(rng, population, low, high):
+    return rng.sample(population, min(len(population), rng.randint(low, high)))
+
+
+def make_knowledge_base(env, scale=1.0, seed=42):
+    """
+    Crée la base de connaissances : vocabulaires, molécules et leurs relations, noms
+    commerciaux, interactions et diagnostics. Retourne {nom: ids} pour chaque ensemble.
+    """
+    rng = random.Random(seed)
+    data = {}
+    for key, model_name, make in (
+        ('classes', 'dynamed.classe.medicale', lambda rng: f'Classe {molecule_name(rng)}'),
+        ('allergies', 'dynamed.allergies', lambda rng: f'Allergie {molecule_name(rng).lower()}'),
+        ('antecedents', 'dynamed.antecedents_medicaux', condition_name),
+        ('indications', 'dynamed.indications', condition_name),
+        ('precautions', 'dynamed.precaution', lambda rng: f'Surveillance {rng.choice(ORGANS)} {rng.choice(TERMS)}'),
+    ):
+        names = unique_names(rng, volume(key, scale), make)
+        data[key] = list(env[model_name]._upsert_names(names).values())
+
+    molecule_names = unique_names(rng, volume('molecules', scale), molecule_name)
+    molecules = env['dynamed.molecule'].create([{
+        'name': name,
+        'grossesse': rng.random() < 0.2,
+        'allaitement': rng.random() < 0.2,
+        'effet_majeurs': f'{condition_name(rng)}, {condition_name(rng)}',
+        'classes_medicales_ids': [(6, 0, sample(rng, data['classes'], 1, 3))],
+        'allergies_ids': [(6, 0, sample(rng, data['allergies'], 0, 4))],
+        'antecedents_medicaux_ids': [(6, 0, sample(rng, data['antecedents'], 0, 3))],
+        'indications_ids': [(6, 0, sample(rng, data['indications'], 1, 5))],
+        'precaution_ids': [(6, 0, sample(rng, data['precautions'], 0, 3))],
+    } for name in molecule_names])
+    data['molecules'] = molecules.ids
+
+    env['nom.commercial'].create([{
+        'name': f'{molecule.name.upper()} {rng.choice(["", "LP ", "Gé "])}{rng.choice([5, 10, 20, 50, 100, 500])}',
+        'dosage': f'{rng.choice([5, 10, 20, 50, 100, 500])} mg',
+        'forme_pharmaceutique': rng.choice(FORMS),
+        'conditionnement': f'Boîte de {rng.choice([10, 14, 28, 30])}',
+        'molecule_id': molecule.id,
+    } for molecule in molecules for _ in range(rng.randint(1, 3))])
+
+    # Environ trois interactions par molécule, une seule par paire
+    pairs = set()
+    for molecule_id in data['molecules']:
+        for other_id in rng.sample(data['molecules'], 3):
+            if other_id != molecule_id:
+                pairs.add((min(molecule_id, other_id), max(molecule_id, other_id)))
+    env['dynamed.interaction'].create([{
+        'medicament_1_id': first_id,
+        'medicament_2_id': second_id,
+        'type_interaction': rng.choice(INTERACTION_TYPES),
+    } for first_id, second_id in sorted(pairs)])
+
+    diagnostics = env['dynamed.diagnostic'].create([
+        {'name': name, 'classe_medicale_ids': [(6, 0, sample(rng, data['classes'], 1, 3))]}
+        for name in unique_names(rng, volume('diagnostics', scale), condition_name)
+    ])
+    data['diagnostics'] = diagnostics.ids
+    env.flush_all()
+    return data
+
+
+def make_practice(env, data, scale=1.0, seed=43):
+    """
+    Crée l'activité des cabinets sur la base de connaissances ``data`` : médecins, patients,
+    consultations sur les 400 derniers jours et demandes d'inscription en période d'essai
+    (dont la moitié expirée). Complète et retourne ``data``.
+    """
+    rng = random.Random(seed)
+    today = fields.Date.today()
+
+    medecins = env['dynamed.medecin'].create([
+        {'name': f'Dr Bench {i:04d}', 'login': f'bench.medecin.{seed}.{i:04d}@example.com'}
+        for i in range(volume('medecins', scale))
+    ])
+    data['medecins'] = medecins.ids
+
+    patients = env['dynamed.patient'].create([{
+        'name': f'Patient {molecule_name(rng)} {i:05d}',
+        'age': rng.randint(1, 95),
+        'sexe': rng.choice(['homme', 'femme']),
+    } for i in range(volume('patients', scale))])
+    data['patients'] = patients.ids
+
+    consultations = env['dynamed.consultation'].create([{
+        'patient_id': rng.choice(data['patients']),
+        'medecin_id': rng.choice(data['medecins']),
+        'date_consultation': today - timedelta(days=rng.randint(0, 400)),
+        'diagnostics_ids': [(6, 0, sample(rng, data['diagnostics'], 1, 3))],
+        'indications_ids': [(6, 0, sample(rng, data['indications'], 0, 3))],
+        'allergies_ids': [(6, 0, sample(rng, data['allergies'], 0, 2))],
+        'antecedents_medicaux_ids': [(6, 0, sample(rng, data['antecedents'], 0, 2))],
+        'precaution_ids': [(6, 0, sample(rng, data['precautions'], 0, 2))],
+        'femme_enceinte': rng.random() < 0.05,
+        'femme_allaitante': rng.random() < 0.05,
+    } for _ in range(volume('consultations', scale))])
+    data['consultations'] = consultations.ids
+
+    now = fields.Datetime.now()
+    trial_medecins = env['dynamed.medecin'].create([
+        {'name': f'Dr Essai {i:04d}', 'login': f'bench.essai.{seed}.{i:04d}@example.com', 'en_essai': True}
+        for i in range(volume('trials', scale))
+    ])
+    data['trials'] = env['dynamed.inscription.medecin'].create([{
+        'name': medecin.name,
+        'email': medecin.login,
+        'statut': 'essai',
+        'medecin_id': medecin.id,
+        'date_fin_essai': now + timedelta(days=rng.choice([-1, 1]) * rng.randint(1, 30)),
+    } for medecin in trial_medecins]).ids
+    env.flush_all()
+    return data
+
+
+def to_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def molecules_csv(count, seed=44, prefix='Import '):
+    """Fichier des molécules (``import_molecules_data``)"""
+    rng = random.Random(seed)
+    header = ['Nom de la molécule', 'Grossesse', 'Allaitement', 'Effets secondaires majeurs',
+              'Classes thérapeutiques', 'Allergies', 'Antécédents médicaux', 'Catégories d\'âge',
+              'Indications principales', 'Précautions']
+    classes = unique_names(rng, 40, lambda rng: f'Classe {molecule_name(rng)}', prefix)
+    indications = unique_names(rng, 150, condition_name, prefix)
+    return to_csv(header, [[
+        name,
+        'TRUE' if rng.random() < 0.2 else 'FALSE',
+        'TRUE' if rng.random() < 0.2 else 'FALSE',
+        condition_name(rng),
+        ', '.join(sample(rng, classes, 1, 3)),
+        ', '.join(f'Allergie {molecule_name(rng).lower()}' for _ in range(rng.randint(0, 3))),
+        ', '.join(condition_name(rng) for _ in range(rng.randint(0, 2))),
+        rng.choice(['Adulte', 'Enfant', 'Adulte, Enfant']),
+        ', '.join(sample(rng, indications, 1, 4)),
+        ', '.join(f'Surveillance {rng.choice(ORGANS)}' for _ in range(rng.randint(0, 2))),
+    ] for name in unique_names(rng, count, molecule_name, prefix)])
+
+
+def precautions_csv(count, seed=45, prefix='Import '):
+    """Fichier des précautions (``import_precautions``), une par ligne"""
+    rng = random.Random(seed)
+    names = unique_names(rng, count, lambda rng: f'Surveillance {rng.choice(ORGANS)} {rng.choice(TERMS)}', prefix)
+    return to_csv(['Précaution'], [[name] for name in names])
+
+
+def diagnostics_csv(count, seed=46, prefix='Import '):
+    """Fichier des diagnostics et de leurs classes (``import_diagnostics_classes``)"""
+    rng = random.Random(seed)
+    classes = unique_names(rng, 40, lambda rng: f'Classe {molecule_name(rng)}', prefix)
+    return to_csv(['Diagnostic', 'Classe médicale'], [
+        [name, ', '.join(sample(rng, classes, 1, 3))]
+        for name in unique_names(rng, count, condition_name, prefix)
+    ])
+
+
+def commercial_names_csv(count, seed=47, prefix='Import '):
+    """Fichier des noms commerciaux (``import_nom_commercial``)"""
+    rng = random.Random(seed)
+    molecules = unique_names(rng, max(1, count // 2), molecule_name, prefix)
+    return to_csv(
+        ['Nom Commercial', 'DCI (Dénomination Commune Internationale)', 'Dosage', 'Forme Pharmaceutique',
+         'Conditionnement'],
+        [[
+            f'{name.upper()} {i}', rng.choice(molecules), f'{rng.choice([5, 10, 20, 50, 100])} mg',
+            rng.choice(FORMS), f'Boîte de {rng.choice([10, 14, 28, 30])}',
+        ] for i, name in enumerate(unique_names(rng, count, molecule_name, prefix))],
+    )
+
+
+def interactions_csv(count, seed=48, prefix='Import '):
+    """Fichier des interactions (``import_interactions_data``), environ ``count`` paires"""
+    rng = random.Random(seed)
+    molecules = unique_names(rng, max(10, count // 5), molecule_name, prefix)
+    classes = unique_names(rng, 20, lambda rng: f'Classe {molecule_name(rng)}', prefix)
+    rows = []
+    for _ in range(max(1, count // 3)):
+        rows.append([
+            rng.choice(molecules),
+            rng.choice(classes) if rng.random() < 0.5 else '',
+            ', '.join(rng.sample(molecules, 3)),
+            rng.choice(INTERACTION_TYPES),
+        ])
+    return to_csv(['Médicaments 1', 'Class', 'Médicaments', 'Type d\'Interaction'], rows)
@@ -2,3 +2,5 @@
 
 from . import inscription_controller
 from . import dashboard
+from . import prescription_controller
+from . import sync_controller
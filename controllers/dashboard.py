@@ -1,27 +1,45 @@
+import hmac
+
 from odoo import http
 from odoo.http import request
 from datetime import datetime, timedelta
+from werkzeug.exceptions import NotFound
+
+# Jeton attendu par l'export Prometheus (paramètre système ; export désactivé s'il est vide)
+PERF_METRICS_TOKEN_PARAM = 'dynamed.perf_metrics_token'
 
 
 class DynamedDashboard(http.Controller):
 
     @http.route('/dynamed/consultation_stats', type='json', auth='user')
     def consultation_stats(self):
-        # Last 6 months data
-        months = []
-        values = []
-
-        for i in range(6):
-            date = datetime.now() - timedelta(days=30 * (5 - i))
-            month = date.strftime('%b %Y')
-            count = request.env['dynamed.consultation'].search_count([
-                ('date', '>=', date.replace(day=1)),
-                ('date', '<', (date.replace(day=1) + timedelta(days=32)).replace(day=1))
-            ])
-            months.append(month)
-            values.append(count)
+        # Last 6 months data, read from the daily statistics rollup
+        month_starts = [datetime.now().date().replace(day=1)]
+        for i in range(5):
+            month_starts.insert(0, (month_starts[0] - timedelta(days=1)).replace(day=1))
+
+        groups = request.env['dynamed.consultation.stat'].get_counts(month_starts[0], groupby='date:month')
+        counts = {month: count for month, count in groups}
 
         return {
-            'months': months,
-            'values': values,
-        }
\ No newline at end of file
+            'months': [month.strftime('%b %Y') for month in month_starts],
+            'values': [counts.get(month, 0) for month in month_starts],
+        }
+
+    @http.route('/dynamed/medecin_activity', type='json', auth='user')
+    def medecin_activity(self, order='date_derniere_activite desc', limit=80, offset=0):
+        # Doctors with their counters, sorted and paginated by the database
+        return request.env['dynamed.medecin'].get_activity(order=order, limit=limit, offset=offset)
+
+    @http.route('/dynamed/metrics', type='http', auth='public', methods=['GET'], csrf=False, save_session=False)
+    def perf_metrics(self, token=None):
+        # Prometheus exposition format, for a scraper authenticated by the configured token
+        expected = request.env['ir.config_parameter'].sudo().get_param(PERF_METRICS_TOKEN_PARAM)
+        authorization = request.httprequest.headers.get('Authorization', '')
+        token = token or authorization.removeprefix('Bearer ').strip()
+        if not expected or not hmac.compare_digest(token.encode(), expected.encode()):
+            raise NotFound()
+        return request.make_response(
+            request.env['dynamed.perf.sample'].sudo().get_prometheus_metrics(),
+            headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')],
+        )
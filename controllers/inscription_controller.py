@@ -1,12 +1,14 @@
 from odoo import http,fields
 from odoo.http import request
-import base64
 from datetime import datetime, timedelta
 
+from ..models.perf_sample import instrument
+
 
 class InscriptionMedecinController(http.Controller):
 
     @http.route('/inscription/medecin', type='http', auth="public", website=True)
+    @instrument()
     def inscription_medecin_form(self, **kw):
         specialites =   request.env['dynamed.specialite'].search([])
         return request.render('dynamed.inscription_medecin_form', {
@@ -14,12 +16,12 @@ class InscriptionMedecinController(http.Controller):
         })
 
     @http.route('/inscription/medecin/submit', type='http', auth="public", website=True, csrf=False)
+    @instrument()
     def submit_inscription(self, **post):
         InscriptionMedecin = request.env['dynamed.inscription.medecin']
 
         # Récupération du fichier de preuve de paiement
         preuve_paiement_file = request.httprequest.files.get('preuve_paiement')
-        preuve_paiement_data = base64.b64encode(preuve_paiement_file.read()) if preuve_paiement_file else False
 
         values = {
             'name': post.get('name'),
@@ -27,10 +29,12 @@ class InscriptionMedecinController(http.Controller):
             'email': post.get('email'),
             'type_pratique': post.get('type_pratique'),
             'specialite_id': int(post.get('specialite_id')) if post.get('specialite_id') else False,
-            'preuve_paiement': preuve_paiement_data,
         }
 
         inscription = InscriptionMedecin.create(values)
+        if preuve_paiement_file:
+            # Copié en flux dans le filestore, sans passer par la mémoire
+            inscription._upload_payment_proof(preuve_paiement_file)
         # Send notification
         inscription._notify_admins('inscription')
 
@@ -38,6 +42,7 @@ class InscriptionMedecinController(http.Controller):
         return request.render('dynamed.inscription_success_template')
 
     @http.route('/medecin/upload/payment', type='http', auth="public", website=True)
+    @instrument()
     def upload_payment(self, **kw):
         # Get inscription ID from URL
         print(f"Accessing upload payment with params: {kw}")
@@ -54,8 +59,8 @@ class InscriptionMedecinController(http.Controller):
             proof_file = request.httprequest.files.get('preuve_paiement')
             if proof_file:
                 # Save payment proof
+                inscription._upload_payment_proof(proof_file)
                 inscription.write({
-                    'preuve_paiement': base64.b64encode(proof_file.read()),
                     'statut': 'paiement_attente'  # en attente de validation de payment
                 })
 
@@ -69,6 +74,7 @@ class InscriptionMedecinController(http.Controller):
         })
 
     @http.route('/payment/success', type='http', auth="public", website=True)
+    @instrument()
     def payment_success(self, **kw):
         """
         Display payment success confirmation page
@@ -0,0 +1,41 @@
+from odoo import http
+from odoo.http import request
+from werkzeug.exceptions import NotFound
+
+# Catalogues proposés à l'autocomplétion : nom dans l'URL -> modèle
+AUTOCOMPLETE_CATALOGS = {
+    'molecule': 'dynamed.molecule',
+    'nom_commercial': 'nom.commercial',
+}
+
+
+class DynamedPrescriptionController(http.Controller):
+
+    @http.route('/dynamed/prescription/interaction_matrix', type='json', auth='user')
+    def interaction_matrix(self, molecule_ids):
+        """Matrice des interactions entre les molécules candidates d'une ordonnance"""
+        return request.env['dynamed.prescription'].get_interaction_matrix(molecule_ids)
+
+    @http.route('/dynamed/autocomplete/<string:catalog>', type='json', auth='user')
+    def autocomplete(self, catalog, query, limit=20):
+        """Autocomplétion des molécules et des noms commerciaux, accents et casse ignorés"""
+        model_name = AUTOCOMPLETE_CATALOGS.get(catalog)
+        if not model_name:
+            raise NotFound()
+        return request.env[model_name].autocomplete(query, limit=limit)
+
+    @http.route('/dynamed/diagnostic/<int:diagnostic_id>/molecules', type='json', auth='user')
+    def diagnostic_molecules(self, diagnostic_id, limit=80, offset=0):
+        """Molécules candidates d'un diagnostic (celles de ses classes médicales), page par page"""
+        diagnostic = request.env['dynamed.diagnostic'].browse(diagnostic_id).exists()
+        if not diagnostic:
+            raise NotFound()
+        return diagnostic.get_candidate_molecules(limit=max(1, min(int(limit), 200)), offset=max(0, int(offset)))
+
+    @http.route('/dynamed/consultation/<int:consultation_id>/recommendations', type='json', auth='user')
+    def recommendations(self, consultation_id, limit=10, offset=0):
+        """Meilleures molécules recommandées pour une consultation, page par page"""
+        consultation = request.env['dynamed.consultation'].browse(consultation_id).exists()
+        if not consultation:
+            raise NotFound()
+        return consultation.get_recommendations(limit=max(1, min(int(limit), 100)), offset=max(0, int(offset)))
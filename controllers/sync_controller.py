@@ -0,0 +1,54 @@
+import hashlib
+import json
+
+from odoo import http
+from odoo.exceptions import UserError
+from odoo.http import request
+from odoo.tools import json_default
+from werkzeug.exceptions import BadRequest, NotFound
+
+from ..models.sync import SYNC_PAGE_SIZE
+
+# Ressources synchronisées avec l'application React : nom dans l'URL -> modèle
+SYNC_RESOURCES = {
+    'patients': 'dynamed.patient',
+    'consultations': 'dynamed.consultation',
+    'prescriptions': 'dynamed.prescription',
+    'molecules': 'dynamed.molecule',
+    'commercial_names': 'nom.commercial',
+    'interactions': 'dynamed.interaction',
+    'diagnostics': 'dynamed.diagnostic',
+    'allergies': 'dynamed.allergies',
+    'indications': 'dynamed.indications',
+    'precautions': 'dynamed.precaution',
+    'medical_classes': 'dynamed.classe.medicale',
+    'antecedents_medicaux': 'dynamed.antecedents_medicaux',
+    'medicaments_actuels': 'dynamed.medicaments_actuels',
+}
+
+
+class DynamedSyncController(http.Controller):
+
+    @http.route('/dynamed/sync/<string:resource>', type='http', auth='user', methods=['GET'])
+    def sync(self, resource, cursor=None, limit=SYNC_PAGE_SIZE):
+        """
+        Page de synchronisation d'une ressource depuis ``cursor`` (voir ``get_sync_page``).
+
+        La réponse porte un ETag : si le client renvoie celui de sa dernière page dans
+        ``If-None-Match`` et que rien n'a changé, elle se réduit à un 304 sans contenu.
+        """
+        model_name = SYNC_RESOURCES.get(resource)
+        if not model_name:
+            raise NotFound()
+        try:
+            page = request.env[model_name].get_sync_page(cursor=cursor, limit=max(1, min(int(limit), 2000)))
+        except (UserError, ValueError) as e:
+            raise BadRequest(str(e))
+
+        body = json.dumps(page, default=json_default, ensure_ascii=False)
+        # werkzeug conserve les ETags de If-None-Match sans leurs guillemets
+        digest = hashlib.sha1(body.encode()).hexdigest()
+        headers = [('ETag', '"%s"' % digest), ('Cache-Control', 'private, no-cache')]
+        if digest in request.httprequest.if_none_match:
+            return request.make_response('', headers=headers, status=304)
+        return request.make_response(body, headers=headers + [('Content-Type', 'application/json')])
@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Reprise des compteurs d'activité des médecins (l'ancien calcul n'était pas mis à jour)"""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['dynamed.medecin'].with_context(active_test=False).search([])._recompute_activity()
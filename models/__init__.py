@@ -1,9 +1,17 @@
+from . import knowledge_base
+from . import payment_proof
+from . import search_key
+from . import vocabulary
+from . import sync
+from . import perf_sample
 from . import patient
 from . import medecin
 from . import clinique
 from . import consultation
+from . import consultation_stat
 from . import indications
 from . import dataset
+from . import dataset_job
 from . import allergies
 from . import antecedents_medicaux
 from . import medicaments_actuels
@@ -14,7 +22,9 @@ from . import molecule
 from . import dynamed_prescription
 from . import classe_medicale
 from . import diagnostic
+from . import diagnostic_candidate
 from . import nom_commercial
 from . import interaction
 from . import precaution
 from . import dynamed_dashboard
+from . import mail_dispatcher
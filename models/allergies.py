@@ -2,6 +2,7 @@ from odoo import models, fields
 
 class Allergies(models.Model):
     _name = 'dynamed.allergies'
+    _inherit = ['dynamed.knowledge.mixin', 'dynamed.vocabulary.mixin', 'dynamed.sync.mixin']
     _description = 'Allergies du patient'
 
     name = fields.Char(string="Nom de l'allergie", required=True)
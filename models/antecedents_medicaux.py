@@ -2,6 +2,7 @@ from odoo import models, fields
 
 class AntecedentsMedicaux(models.Model):
     _name = 'dynamed.antecedents_medicaux'
+    _inherit = ['dynamed.knowledge.mixin', 'dynamed.vocabulary.mixin', 'dynamed.sync.mixin']
     _description = 'Antécédents médicaux du patient'
 
     name = fields.Char(string="Nom de l'antécédent", required=True)
@@ -2,8 +2,27 @@ from odoo import models, fields, api
 
 class ClasseMedicale(models.Model):
     _name = 'dynamed.classe.medicale'
+    _inherit = ['dynamed.knowledge.mixin', 'dynamed.vocabulary.mixin', 'dynamed.sync.mixin']
     _description = 'Classes médicales normalisées'
     _order = 'name asc'
 
     name = fields.Char(string='Nom', required=True)
     molecules_ids = fields.Many2many('dynamed.molecule', string="Molecules associées")
+
+    def _get_diagnostic_ids(self):
+        return self.env['dynamed.diagnostic'].with_context(active_test=False).search(
+            [('classe_medicale_ids', 'in', self.ids)]
+        ).ids
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'molecules_ids' in vals:
+            # Les molécules ajoutées ou retirées changent les candidates des diagnostics de la classe
+            self.env['dynamed.diagnostic.candidate']._rebuild(diagnostic_ids=self._get_diagnostic_ids())
+        return res
+
+    def unlink(self):
+        diagnostic_ids = self._get_diagnostic_ids()
+        res = super().unlink()
+        self.env['dynamed.diagnostic.candidate']._rebuild(diagnostic_ids=diagnostic_ids)
+        return res
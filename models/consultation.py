@@ -1,9 +1,36 @@
+import hashlib
+from collections import Counter, defaultdict
+
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+from odoo.tools.sql import create_index
+
+from ..tools import perf
+from .perf_sample import instrument
+
+# Champs dont dépendent les molécules recommandées d'une consultation
+RECOMMENDATION_INPUTS = [
+    'diagnostics_ids', 'indications_ids', 'allergies_ids', 'antecedents_medicaux_ids',
+    'medicament_actuels_ids', 'precaution_ids', 'femme_enceinte', 'femme_allaitante',
+]
+
+# Nombre de recommandations par page (get_recommendations)
+RECOMMENDATION_PAGE_SIZE = 10
+
+# Contre-indications : champ de la consultation -> champ de la molécule
+CONTRAINDICATION_RELATIONS = {
+    'allergies_ids': 'allergies_ids',
+    'antecedents_medicaux_ids': 'antecedents_medicaux_ids',
+    'medicament_actuels_ids': 'medicaments_actuels_ids',
+}
+
+# Champs dont dépend la ligne de statistiques d'une consultation
+STAT_INPUTS = ['date_consultation', 'medecin_id', 'patient_id']
 
 
 class Consultation(models.Model):
     _name = 'dynamed.consultation'
+    _inherit = ['dynamed.sync.mixin']
     _description = 'Consultation'
 
     date_consultation = fields.Date(string='Date de consultation', default=fields.Date.context_today)
@@ -19,6 +46,15 @@ class Consultation(models.Model):
         user = self.env.user
         medecin = self.env['dynamed.medecin'].search([('user_id', '=', user.id)], limit=1)
         return medecin.id if medecin else False
+
+    # Utilisateur du médecin, recopié pour que la règle d'accès n'ait pas de jointure à faire
+    owner_user_id = fields.Many2one(
+        'res.users',
+        string='Propriétaire',
+        related='medecin_id.user_id',
+        store=True,
+        index=True,
+    )
     medecin_phone = fields.Char(related='medecin_id.phone', string='Téléphone du Médecin', readonly=True)
     medecin_email = fields.Char(related='medecin_id.email', string='Email du Médecin', readonly=True)
     medecin_type_pratique = fields.Selection(related='medecin_id.type_pratique', string='Type de Pratique',
@@ -44,6 +80,27 @@ class Consultation(models.Model):
         string='Médicaments Recommandés',
         compute='_compute_valid_molecules',  # Méthode de calcul
     )
+    recommendation_ids = fields.One2many(
+        'dynamed.consultation.recommendation',
+        'consultation_id',
+        string='Recommandations',
+        readonly=True,
+    )
+    recommendation_fingerprint = fields.Char(
+        string='Empreinte des recommandations',
+        readonly=True,
+        copy=False,
+        help="Empreinte des données de la consultation et de la version de la base de connaissances "
+             "ayant servi au calcul des recommandations enregistrées",
+    )
+    stat_id = fields.Many2one(
+        'dynamed.consultation.stat',
+        string='Ligne de statistiques',
+        readonly=True,
+        copy=False,
+        ondelete='set null',
+        help="Ligne de statistiques dans laquelle la consultation est comptée",
+    )
     diagnostics_ids = fields.Many2many(
         'dynamed.diagnostic',
         string='Diagnostics'
@@ -54,113 +111,180 @@ class Consultation(models.Model):
         help='Précautions particulières à prendre en compte pour cette consultation'
     )
 
-    def score_molecules(self):
+    @api.model_create_multi
+    def create(self, vals_list):
+        consultations = super().create(vals_list)
+        consultations._refresh_recommendations()
+        consultations._count_in_stats()
+        self.env['dynamed.medecin']._update_activity(
+            'nombre_consultations', Counter(consultation.medecin_id.id for consultation in consultations)
+        )
+        return consultations
+
+    def write(self, vals):
+        stat_changed = not vals.keys().isdisjoint(STAT_INPUTS)
+        if stat_changed:
+            self.env['dynamed.consultation.stat']._remove(self)
+        medecins = self.medecin_id if 'medecin_id' in vals else None
+        res = super().write(vals)
+        if not vals.keys().isdisjoint(RECOMMENDATION_INPUTS):
+            self._refresh_recommendations()
+        if stat_changed:
+            self._count_in_stats()
+        if medecins is not None:
+            # Les consultations et leurs ordonnances changent de médecin
+            (medecins | self.medecin_id).sudo()._recompute_activity()
+        return res
+
+    def unlink(self):
+        self.env['dynamed.consultation.stat']._remove(self)
+        Medecin = self.env['dynamed.medecin']
+        Medecin._update_activity('nombre_consultations', {
+            medecin_id: -count for medecin_id, count in Counter(record.medecin_id.id for record in self).items()
+        })
+        # Les ordonnances sont supprimées en cascade par la base, sans passer par leur unlink
+        Medecin._update_activity('nombre_ordonnances', {
+            medecin_id: -count
+            for medecin_id, count in Counter(prescription.medecin_id.id for prescription in self.prescription_ids).items()
+        })
+        self.prescription_ids._create_tombstones()
+        return super().unlink()
+
+    def _count_in_stats(self):
+        """Compte les consultations dans les statistiques journalières"""
+        stat_ids = self.env['dynamed.consultation.stat']._add(self)
+        by_stat = defaultdict(list)
+        for consultation, stat_id in stat_ids.items():
+            by_stat[stat_id].append(consultation.id)
+        for stat_id, consultation_ids in by_stat.items():
+            self.browse(consultation_ids).write({'stat_id': stat_id})
+
+    def _get_recommendation_fingerprint(self):
+        """Empreinte des entrées du scoring et de la version de la base de connaissances"""
+        self.ensure_one()
+        payload = [self.env['dynamed.knowledge.mixin']._get_knowledge_base_version()]
+        for field_name in RECOMMENDATION_INPUTS:
+            value = self[field_name]
+            payload.append(sorted(value.ids) if isinstance(value, models.BaseModel) else bool(value))
+        return hashlib.sha1(repr(payload).encode()).hexdigest()
+
+    def _refresh_recommendations(self):
+        """Recalcule les recommandations enregistrées des consultations dont l'empreinte a changé"""
+        stale = {}
+        for consultation in self:
+            fingerprint = consultation._get_recommendation_fingerprint()
+            if consultation.recommendation_fingerprint != fingerprint:
+                stale[consultation] = fingerprint
+        if not stale:
+            perf.mark_cache_hit()
+            return
+
+        # Les recommandations ne sont écrites que par ce calcul : les utilisateurs n'y ont
+        # qu'un accès en lecture
+        consultations = self.browse([consultation.id for consultation in stale])
+        consultations.sudo().recommendation_ids.unlink()
+        self.env['dynamed.consultation.recommendation'].sudo().create([
+            {
+                'consultation_id': consultation.id,
+                'molecule_id': molecule_id,
+                'score': score,
+                'rank': rank,
+            }
+            for consultation in consultations
+            for rank, (molecule_id, score) in enumerate(consultation._get_molecule_scores(), 1)
+        ])
+        for consultation, fingerprint in stale.items():
+            consultation.write({'recommendation_fingerprint': fingerprint})
+
+    def _get_molecule_scores(self):
         """
         Score molecules based on diagnostics, indications, and contraindications.
         Only molecules that belong to the medical classes associated with selected diagnostics are considered.
+
+        Returns a list of (molecule_id, score) with a positive score, best first.
         """
         self.ensure_one()
-        scored_molecules = []
 
-        # Step 1: Get medical classes from selected diagnostics
-        medical_class_ids = self.diagnostics_ids.mapped('classe_medicale_ids').ids
-        if not medical_class_ids:
+        # Step 1: the selected diagnostics, whose candidate molecules (those of their medical
+        # classes) are materialized in dynamed.diagnostic.candidate
+        if not self.diagnostics_ids:
+            return []
+
+        # Steps 2 to 4, in the database: candidate molecules, minus contraindicated ones,
+        # scored on indications (+2) and precautions (-1)
+        return self.env['dynamed.molecule'].sudo()._get_scores(
+            self.diagnostics_ids.ids,
+            {
+                molecule_field: self[consultation_field].ids
+                for consultation_field, molecule_field in CONTRAINDICATION_RELATIONS.items()
+            },
+            self.indications_ids.ids,
+            self.precaution_ids.ids,
+            pregnant=self.femme_enceinte,
+            breastfeeding=self.femme_allaitante,
+        )
+
+    def _get_molecule_details(self, scored):
+        """Détails d'affichage pour une liste de (molecule_id, score)"""
+        molecules = self.env['dynamed.molecule'].browse([molecule_id for molecule_id, score in scored])
+        return [
+            {
+                'molecule_id': molecule.id,
+                'name': molecule.name,
+                'score': score,
+                'indications': ', '.join(i.name for i in molecule.indications_ids),
+                'precautions': ', '.join(p.name for p in molecule.precaution_ids),
+                'side_effects': molecule.effet_majeurs or '',
+                'commercial_names': ', '.join(n.name for n in molecule.nom_commercial_ids),
+                'medical_classes': ', '.join(c.name for c in molecule.classes_medicales_ids)
+            }
+            for molecule, (molecule_id, score) in zip(molecules, scored)
+        ]
+
+    @instrument()
+    def score_molecules(self, limit=None, offset=0):
+        """Return the scored molecules of the consultation, best first, from the stored recommendations.
+
+        Only the ``limit`` molecules after ``offset`` are read and get their display details.
+        """
+        self.ensure_one()
+        if not self.diagnostics_ids.mapped('classe_medicale_ids'):
             raise UserError("Aucun classe médicale associée aux diagnostics sélectionnés.")
 
-        # Step 2: Get molecules belonging to these medical classes
-        molecules = self.env['dynamed.molecule'].search([
-            ('classes_medicales_ids', 'in', medical_class_ids)
+        self._refresh_recommendations()
+        recommendations = self.env['dynamed.consultation.recommendation'].search(
+            [('consultation_id', '=', self.id)], order='rank', limit=limit, offset=offset,
+        )
+        return self._get_molecule_details([
+            (recommendation.molecule_id.id, recommendation.score)
+            for recommendation in recommendations
         ])
 
-        # Step 3: Prepare contraindications data from consultation
-        contraindications = {
-            'allergies': [a.name.lower() for a in self.allergies_ids],
-            'medical_history': [h.name.lower() for h in self.antecedents_medicaux_ids],
-            'current_meds': [m.name.lower() for m in self.medicament_actuels_ids],
-            'pregnancy': self.femme_enceinte,
-            'breastfeeding': self.femme_allaitante
+    def get_recommendations(self, limit=RECOMMENDATION_PAGE_SIZE, offset=0):
+        """Page de recommandations (« afficher plus ») : les ``limit`` meilleures molécules
+        après ``offset``, avec le nombre total de molécules recommandées"""
+        self.ensure_one()
+        results = self.score_molecules(limit=limit, offset=offset)
+        return {
+            'total': self.env['dynamed.consultation.recommendation'].search_count(
+                [('consultation_id', '=', self.id)]
+            ),
+            'offset': offset,
+            'limit': limit,
+            'results': results,
         }
 
-        # Step 4: Prepare indications and precautions
-        indications = [i.name.lower() for i in self.indications_ids]
-        precautions = [p.name.lower() for p in self.precaution_ids]
-
-        for molecule in molecules:
-            score = 0
-            skip_molecule = False
-
-            # Check contraindications
-            if molecule.allergies_ids:
-                for allergy in contraindications['allergies']:
-                    if allergy in [a.name.lower() for a in molecule.allergies_ids]:
-                        skip_molecule = True
-                        break
-
-            if not skip_molecule and molecule.antecedents_medicaux_ids:
-                for condition in contraindications['medical_history']:
-                    if condition in [c.name.lower() for c in molecule.antecedents_medicaux_ids]:
-                        skip_molecule = True
-                        break
-
-            if not skip_molecule and molecule.medicaments_actuels_ids:
-                for med in contraindications['current_meds']:
-                    if med in [m.name.lower() for m in molecule.medicaments_actuels_ids]:
-                        skip_molecule = True
-                        break
-
-            if not skip_molecule and contraindications['pregnancy'] and molecule.grossesse:
-                skip_molecule = True
-
-            if not skip_molecule and contraindications['breastfeeding'] and molecule.allaitement:
-                skip_molecule = True
-
-            if skip_molecule:
-                continue
-
-            # Score based on indications
-            if molecule.indications_ids:
-                molecule_indications = [i.name.lower() for i in molecule.indications_ids]
-                for indication in indications:
-                    if indication in molecule_indications:
-                        score += 2
-
-            # Deduct for precautions
-            if molecule.precaution_ids:
-                molecule_precautions = [p.name.lower() for p in molecule.precaution_ids]
-                for precaution in precautions:
-                    if precaution in molecule_precautions:
-                        score -= 1
-
-            # Add to results if score > 0
-            if score > 0:
-                scored_molecules.append({
-                    'molecule_id': molecule.id,
-                    'name': molecule.name,
-                    'score': score,
-                    'indications': ', '.join(i.name for i in molecule.indications_ids),
-                    'precautions': ', '.join(p.name for p in molecule.precaution_ids),
-                    'side_effects': molecule.effet_majeurs or '',
-                    'commercial_names': ', '.join(n.name for n in molecule.nom_commercial_ids),
-                    'medical_classes': ', '.join(c.name for c in molecule.classes_medicales_ids)
-                })
-
-        scored_molecules.sort(key=lambda x: x['score'], reverse=True)
-        valid_molecule_ids = [m['molecule_id'] for m in scored_molecules]
-        self.write({'valid_molecules': [(6, 0, valid_molecule_ids)]})
-
-        return scored_molecules
- 
     def action_score_molecules(self):
         """Action to score molecules and show results"""
         self.ensure_one()
-        results = self.score_molecules()
+        results = self.score_molecules(limit=1)
 
         if not results:
             raise UserError("Aucune molécule valide trouvée pour ce patient.")
 
         # Prepare message with results
         message_lines = []
-        for mol in results[:1]:  # Show top 10 results
+        for mol in results:
             message_lines.append(
                 f"{mol['name']} (Score: {mol['score']})\n"
                 f"Indications: {mol['indications']}\n"
@@ -181,25 +305,17 @@ class Consultation(models.Model):
             }
         }
 
-    @api.depends(
-        'indications_ids', 'allergies_ids', 'antecedents_medicaux_ids',
-        'medicament_actuels_ids', 'precaution_ids', 'femme_enceinte',
-        'femme_allaitante', 'type_patient'
-    )
+    @api.depends('recommendation_ids.rank', 'recommendation_ids.molecule_id')
+    @instrument()
     def _compute_valid_molecules(self):
-        """Compute method for valid_molecules field"""
+        """Compute method for valid_molecules field, read from the stored recommendations"""
         for consultation in self:
-            if not consultation.id:  # New record, not saved yet
-                consultation.valid_molecules = False
-                continue
-
-            # Call score_molecules but only keep the IDs
-            scored_molecules = consultation.score_molecules()
-            consultation.valid_molecules = [(6, 0, [m['molecule_id'] for m in scored_molecules])]
+            consultation.valid_molecules = consultation.recommendation_ids.molecule_id
 
     def action_generate_prescription(self):
         self.ensure_one()
 
+        self._refresh_recommendations()
         if not self.valid_molecules:
             raise UserError("Aucune molécule valide disponible.")
 
@@ -207,14 +323,14 @@ class Consultation(models.Model):
             'consultation_id': self.id,
         })
 
-        # Créer une ligne par molécule (sans dupliquer)
-        for molecule in self.valid_molecules:
-            first_commercial = molecule.nom_commercial_ids[0] if molecule.nom_commercial_ids else False
-            self.env['prescription.molecule.line'].create({
-                'prescription_id': prescription.id,
-                'molecule_id': molecule.id,
-                'commercial_name_id': first_commercial.id if first_commercial else False,
-            })
+        # Créer une ligne par molécule (sans dupliquer), en un seul lot : les noms commerciaux
+        # de toutes les molécules sont lus ensemble et les interactions vérifiées en une passe
+        molecules = self.valid_molecules
+        self.env['prescription.molecule.line'].create([{
+            'prescription_id': prescription.id,
+            'molecule_id': molecule.id,
+            'commercial_name_id': molecule.nom_commercial_ids[:1].id,
+        } for molecule in molecules])
 
         return {
             'type': 'ir.actions.act_window',
@@ -222,4 +338,28 @@ class Consultation(models.Model):
             'res_model': 'dynamed.prescription',
             'res_id': prescription.id,
             'target': 'current',
-        }
\ No newline at end of file
+        }
+
+
+class ConsultationRecommendation(models.Model):
+    _name = 'dynamed.consultation.recommendation'
+    _description = 'Molécule recommandée pour une consultation'
+    _order = 'consultation_id, rank'
+
+    consultation_id = fields.Many2one(
+        'dynamed.consultation',
+        string='Consultation',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    molecule_id = fields.Many2one('dynamed.molecule', string='Molécule', required=True, ondelete='cascade')
+    rank = fields.Integer(string='Rang')
+    score = fields.Integer(string='Score')
+
+    def init(self):
+        super().init()
+        # Pages de recommandations d'une consultation, dans l'ordre du classement
+        create_index(
+            self.env.cr, 'dynamed_consultation_recommendation_rank_idx', self._table, ['consultation_id', 'rank'],
+        )
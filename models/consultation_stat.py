@@ -0,0 +1,156 @@
+from collections import Counter, defaultdict
+
+from odoo import models, fields, api
+from odoo.tools.sql import create_unique_index, index_exists
+
+AGE_GROUPS = [
+    ('0-10', '0-10'),
+    ('11-18', '11-18'),
+    ('19-30', '19-30'),
+    ('31-50', '31-50'),
+    ('50+', '50+'),
+]
+
+
+class ConsultationStat(models.Model):
+    _name = 'dynamed.consultation.stat'
+    _description = 'Statistiques journalières des consultations'
+    _order = 'date desc'
+
+    date = fields.Date(string='Date', required=True, index=True, readonly=True)
+    medecin_id = fields.Many2one('dynamed.medecin', string='Médecin', ondelete='cascade', readonly=True)
+    specialite_id = fields.Many2one('dynamed.specialite', string='Spécialité', ondelete='set null', readonly=True)
+    age_group = fields.Selection(AGE_GROUPS, string="Tranche d'âge", readonly=True)
+    consultation_count = fields.Integer(string='Consultations', readonly=True)
+    # Utilisateur du médecin, recopié à l'écriture des lignes pour que la règle d'accès
+    # n'ait pas de jointure à faire
+    owner_user_id = fields.Many2one('res.users', string='Propriétaire', readonly=True, index=True)
+
+    def init(self):
+        super().init()
+        cr = self.env.cr
+        # Lignes antérieures à la colonne propriétaire
+        cr.execute(f"""
+            UPDATE {self._table} stat
+               SET owner_user_id = medecin.user_id
+              FROM dynamed_medecin medecin
+             WHERE medecin.id = stat.medecin_id
+               AND stat.owner_user_id IS NULL
+        """)
+        if index_exists(cr, 'dynamed_consultation_stat_key_uniq'):
+            return
+        create_unique_index(
+            cr, 'dynamed_consultation_stat_key_uniq', self._table,
+            ['date', 'COALESCE(medecin_id, 0)', 'COALESCE(specialite_id, 0)', "COALESCE(age_group, '')"],
+        )
+        # Première installation : calculer les statistiques des consultations existantes
+        self._rebuild()
+
+    @api.model
+    def _get_key(self, consultation):
+        """Clé de regroupement (date, médecin, spécialité, tranche d'âge) d'une consultation"""
+        return (
+            consultation.date_consultation or consultation.create_date.date(),
+            consultation.medecin_id.id or None,
+            consultation.medecin_id.specialite_id.id or None,
+            consultation.patient_id.age_group or None,
+        )
+
+    @api.model
+    def _add(self, consultations):
+        """
+        Compte des consultations dans leur ligne de statistiques (créée au besoin) et
+        retourne {consultation: id de la ligne}. Une seule requête d'upsert pour le lot.
+        """
+        keys = {consultation: self._get_key(consultation.sudo()) for consultation in consultations}
+        owners = {key: consultation.sudo().medecin_id.user_id.id or None for consultation, key in keys.items()}
+        counts = Counter(keys.values())
+        if not counts:
+            return {}
+        self.env.cr.execute(f"""
+            INSERT INTO {self._table} (date, medecin_id, specialite_id, age_group, consultation_count, owner_user_id,
+                                       create_uid, create_date, write_uid, write_date)
+                 VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s, now() at time zone %s, %s, now() at time zone %s)'] * len(counts))}
+            ON CONFLICT (date, COALESCE(medecin_id, 0), COALESCE(specialite_id, 0), COALESCE(age_group, ''))
+              DO UPDATE SET consultation_count = {self._table}.consultation_count + EXCLUDED.consultation_count,
+                            write_date = EXCLUDED.write_date
+              RETURNING id, date, medecin_id, specialite_id, age_group
+        """, [
+            value
+            for key, count in counts.items()
+            for value in (*key, count, owners[key], self.env.uid, 'UTC', self.env.uid, 'UTC')
+        ])
+        stat_ids = {tuple(row[1:]): row[0] for row in self.env.cr.fetchall()}
+        self.invalidate_model(['consultation_count'])
+        return {consultation: stat_ids[key] for consultation, key in keys.items()}
+
+    @api.model
+    def _remove(self, consultations):
+        """Décompte des consultations de leur ligne de statistiques, et supprime les lignes
+        qui ne comptent plus aucune consultation"""
+        counts = Counter(consultation.stat_id.id for consultation in consultations if consultation.stat_id)
+        if not counts:
+            return
+        by_count = defaultdict(list)
+        for stat_id, count in counts.items():
+            by_count[count].append(stat_id)
+        for count, stat_ids in by_count.items():
+            self.env.cr.execute(
+                f"UPDATE {self._table} SET consultation_count = consultation_count - %s WHERE id IN %s",
+                [count, tuple(stat_ids)],
+            )
+        self.env.cr.execute(
+            f"DELETE FROM {self._table} WHERE id IN %s AND consultation_count <= 0",
+            [tuple(counts)],
+        )
+        if self.env.cr.rowcount:
+            # Les consultations des lignes supprimées n'ont plus de ligne (ondelete='set null')
+            self.env['dynamed.consultation'].invalidate_model(['stat_id'])
+        self.invalidate_model(['consultation_count'])
+
+    @api.model
+    def _rebuild(self):
+        """Recalcule toutes les statistiques à partir des consultations (reprise d'historique)"""
+        cr = self.env.cr
+        cr.execute("UPDATE dynamed_consultation SET stat_id = NULL WHERE stat_id IS NOT NULL")
+        cr.execute(f"DELETE FROM {self._table}")
+        cr.execute(f"""
+            WITH keyed AS (
+                SELECT c.id,
+                       COALESCE(c.date_consultation, c.create_date::date) AS date,
+                       c.medecin_id,
+                       m.specialite_id,
+                       p.age_group,
+                       m.user_id
+                  FROM dynamed_consultation c
+             LEFT JOIN dynamed_medecin m ON m.id = c.medecin_id
+             LEFT JOIN dynamed_patient p ON p.id = c.patient_id
+            ), stats AS (
+                INSERT INTO {self._table} (date, medecin_id, specialite_id, age_group, consultation_count,
+                                           owner_user_id, create_uid, create_date, write_uid, write_date)
+                     SELECT date, medecin_id, specialite_id, age_group, count(*), max(user_id),
+                            %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+                       FROM keyed
+                   GROUP BY date, medecin_id, specialite_id, age_group
+                  RETURNING id, date, medecin_id, specialite_id, age_group
+            )
+            UPDATE dynamed_consultation c
+               SET stat_id = stats.id
+              FROM keyed
+              JOIN stats ON stats.date = keyed.date
+                        AND stats.medecin_id IS NOT DISTINCT FROM keyed.medecin_id
+                        AND stats.specialite_id IS NOT DISTINCT FROM keyed.specialite_id
+                        AND stats.age_group IS NOT DISTINCT FROM keyed.age_group
+             WHERE c.id = keyed.id
+        """, {'uid': self.env.uid})
+        self.env.invalidate_all()
+        return True
+
+    @api.model
+    def get_counts(self, date_from, groupby='date:day'):
+        """Retourne [(valeur du regroupement, nombre de consultations)] depuis ``date_from``"""
+        return self._read_group(
+            [('date', '>=', date_from)],
+            groupby=[groupby],
+            aggregates=['consultation_count:sum'],
+        )
@@ -1,9 +1,28 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
-import base64
+from odoo.tools import config
 import csv
-import re
-from io import StringIO
+import functools
+import io
+import time
+
+from ..tools.csv_stream import Base64Reader, CountingReader, count_lines, iter_chunks, open_text
+from ..tools.interaction_parse import interaction_parser, split_values
+from ..tools import perf
+from .perf_sample import instrument
+
+# Nombre d'enregistrements créés par appel lors des insertions en masse
+INSERT_BATCH_SIZE = 10000
+
+# Colonnes du fichier des molécules : colonne -> (champ de dynamed.molecule, modèle cible)
+MOLECULE_COLUMNS = {
+    'Classes thérapeutiques': ('classes_medicales_ids', 'dynamed.classe.medicale'),
+    'Allergies': ('allergies_ids', 'dynamed.allergies'),
+    'Antécédents médicaux': ('antecedents_medicaux_ids', 'dynamed.antecedents_medicaux'),
+    'Catégories d\'âge': ('categories_age_id', 'dynamed.age.category'),
+    'Indications principales': ('indications_ids', 'dynamed.indications'),
+    'Précautions': ('precaution_ids', 'dynamed.precaution'),
+}
 
 
 class DataSet(models.Model):
@@ -14,333 +33,537 @@ class DataSet(models.Model):
     file = fields.Binary(string='Fichier CSV', required=True)
     file_name = fields.Char(string='Nom du fichier')
 
+    streaming = fields.Boolean(
+        string='Import en flux',
+        help="Lit le fichier en flux et valide l'import par lots : un incident n'annule que le lot en cours "
+             "et l'import reprend après la dernière ligne validée.",
+    )
+    chunk_size = fields.Integer(
+        string='Taille des lots',
+        default=1000,
+        help="Nombre de lignes traitées par lot : l'avancement est enregistré après chaque lot, "
+             "et en mode flux chaque lot est validé séparément.",
+    )
+    parse_workers = fields.Integer(
+        string='Processus de lecture',
+        default=0,
+        help="Nombre de processus utilisés pour analyser les gros fichiers d'interactions (0 : un par CPU). "
+             "Uniquement avec un serveur en mode multi-processus (workers) : le serveur multi-thread "
+             "analyse toujours dans son propre processus.",
+    )
+
+    job_ids = fields.One2many('dynamed.dataset.job', 'dataset_id', string="Imports")
+    job_id = fields.Many2one('dynamed.dataset.job', string='Dernier import', readonly=True, copy=False)
+    job_state = fields.Selection(related='job_id.state', string="État de l'import")
+    job_progress = fields.Float(related='job_id.progress', string='Avancement (%)')
+    job_throughput = fields.Float(related='job_id.throughput', string='Débit (lignes/s)')
+    job_message = fields.Text(related='job_id.message', string='Résultat')
+    job_error_log = fields.Text(related='job_id.error_log', string="Journal d'erreurs")
+    last_row = fields.Integer(
+        string='Dernière ligne traitée',
+        readonly=True,
+        copy=False,
+        help="Point de reprise de l'import en flux (0 : l'import repart du début)",
+    )
+
+    def write(self, vals):
+        if 'file' in vals:
+            vals = dict(vals, last_row=0)
+        return super().write(vals)
+
+    def action_enqueue_import(self):
+        """Met l'import ``import_method`` (contexte) en file d'attente au lieu de l'exécuter
+        dans la requête HTTP : il sera exécuté par la tâche planifiée des imports."""
+        self.ensure_one()
+        method = self.env.context.get('import_method')
+        if not self.file:
+            raise UserError(_("Aucun fichier attaché"))
+        if self.job_id.state == 'running':
+            self.env['dynamed.dataset.job']._recover_stale_jobs()
+        if self.job_id.state in ('queued', 'running'):
+            raise UserError(_("Un import est déjà en cours pour ce fichier."))
+
+        self.job_id = self.env['dynamed.dataset.job'].create({
+            'dataset_id': self.id,
+            'method': method,
+        })
+        self.env.ref('dynamed.ir_cron_dataset_import_jobs').sudo()._trigger()
+        return self._import_notification(
+            _("Import planifié"),
+            _("L'import a été mis en file d'attente. Son avancement est visible sur cette fiche."),
+        )
+
     def _split_values(self, text):
         """Fonction pour séparer les valeurs selon différents séparateurs"""
-        if not text:
-            return []
+        return split_values(text)
 
-        # Normaliser les séparateurs (remplacer les tirets par des virgules)
-        normalized_text = re.sub(r'(\s*-\s*|\s*,\s*)', '|', text.strip())
-        # Supprimer les espaces autour des pipes et filtrer les valeurs vides
-        return [v.strip() for v in normalized_text.split('|') if v.strip()]
+    # ------------------------------------------------------------------
+    # Moteur d'import
+    # ------------------------------------------------------------------
 
-    def import_molecules_data(self):
-        """Méthode principale pour l'importation"""
+    def _open_file_stream(self):
+        """Retourne un flux binaire sur le contenu du fichier et sa taille en octets, sans
+        charger le fichier en mémoire quand il est stocké dans le filestore"""
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'file'),
+        ], limit=1)
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb'), attachment.file_size
+        if attachment:
+            return io.BytesIO(attachment.raw), attachment.file_size
+        encoded = self.with_context(bin_size=False).file
+        return Base64Reader(encoded), len(encoded) * 3 // 4
+
+    def _import_stream(self, process_chunk, encoding='utf-8', header=True):
+        """
+        Lit le fichier CSV et passe ses lignes, par lots de ``chunk_size``, à
+        ``process_chunk(rows, state)``.
+
+        ``state`` est partagé entre les lots : il contient les statistiques (``state['stats']``)
+        et les correspondances nom -> id déjà chargées, de sorte que la mémoire utilisée dépend
+        du référentiel et de la taille des lots, pas de la taille du fichier.
+
+        En mode standard, tout le fichier est importé dans une seule transaction. En mode
+        flux, chaque lot est validé (commit) avec le numéro de sa dernière ligne comme point
+        de reprise ; en cas d'erreur seul le lot en cours est annulé.
+
+        :param header: lignes lues en dictionnaires (DictReader) si vrai, en listes sinon
+            (la première ligne, l'en-tête, est alors ignorée)
+        """
         self.ensure_one()
 
         if not self.file:
             raise UserError(_("Aucun fichier attaché"))
 
-        try:
-            file_content = base64.b64decode(self.file).decode('utf-8')
-            csv_file = StringIO(file_content)
-            reader = csv.DictReader(csv_file)
-
-            models = {
-                'molecule': self.env['dynamed.molecule'],
-                'allergies': self.env['dynamed.allergies'],
-                'antecedents': self.env['dynamed.antecedents_medicaux'],
-                'age': self.env['dynamed.age.category'],
-                'indications': self.env['dynamed.indications'],
-                'classe_medicale': self.env['dynamed.classe.medicale'],  # Modifié pour correspondre au nom du modèle
-                'precaution': self.env['dynamed.precaution']
-            }
-
-            for row in reader:
-                if not row.get('Nom de la molécule'):
-                    continue
-
-                # Gestion de la molécule de base
-                molecule_name = row['Nom de la molécule'].strip()
-                molecule = models['molecule'].search([('name', '=', molecule_name)], limit=1)
-
-                vals = {
-                    'name': molecule_name,
-                    'grossesse': row.get('Grossesse', '').strip().upper() == 'TRUE',
-                    'allaitement': row.get('Allaitement', '').strip().upper() == 'TRUE',
-                    'effet_majeurs': row.get('Effets secondaires majeurs', '').strip(),
-                }
-
-                if not molecule:
-                    molecule = models['molecule'].create(vals)
-                else:
-                    molecule.write(vals)
-
-                # Mapping corrigé pour utiliser le bon nom de champ
-                mapping = {
-                    'Classes thérapeutiques': ('classes_medicales_ids', 'classe_medicale'),
-                    'Allergies': ('allergies_ids', 'allergies'),
-                    'Antécédents médicaux': ('antecedents_medicaux_ids', 'antecedents'),
-                    'Catégories d\'âge': ('categories_age_id', 'age'),  # One2many spécial
-                    'Indications principales': ('indications_ids', 'indications'),
-                    'Précautions': ('precaution_ids', 'precaution')
-                }
-
-                for col_name, (field_name, model_key) in mapping.items():
-                    if row.get(col_name):
-                        items = self._split_values(row[col_name])
-                        if field_name.endswith('_id'):  # Gestion spéciale pour les One2many
-                            if items:
-                                item = models[model_key].search([('name', '=', items[0])], limit=1)
-                                if not item:
-                                    item = models[model_key].create({'name': items[0]})
-                                molecule.write({field_name: item.id})
-                        else:
-                            item_ids = []
-                            for item_name in items:
-                                item = models[model_key].search([('name', '=', item_name)], limit=1)
-                                if not item:
-                                    item = models[model_key].create({'name': item_name})
-                                item_ids.append(item.id)
-                            if item_ids:
-                                molecule.write({field_name: [(6, 0, item_ids)]})
-
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': 'Succès',
-                    'message': 'Importation terminée avec succès',
-                    'sticky': False,
-                }
+        streaming = self.streaming
+        start_row = self.last_row if streaming else 0
+        stream, size = self._open_file_stream()
+        state = {'stats': {'rows': 0}, 'start': time.perf_counter(), 'size': size, 'bytes_read': 0}
+
+        with CountingReader(stream) as raw:
+            text = open_text(raw, encoding)
+            if header:
+                reader = csv.DictReader(text)
+            else:
+                reader = csv.reader(text, delimiter=',')
+                next(reader, None)
+            rows = enumerate(reader, 1)
+            if start_row:
+                rows = (item for item in rows if item[0] > start_row)
+
+            for chunk in iter_chunks(rows, max(self.chunk_size, 1)):
+                try:
+                    process_chunk([row for row_number, row in chunk], state)
+                except Exception as e:
+                    if not streaming:
+                        raise
+                    self.env.cr.rollback()
+                    raise UserError(_(
+                        "Erreur lors de l'importation des lignes %(first)s à %(last)s : %(error)s\n"
+                        "Les lignes précédentes ont été enregistrées, l'import reprendra à la ligne %(first)s.",
+                        first=chunk[0][0], last=chunk[-1][0], error=e,
+                    ))
+                state['stats']['rows'] += len(chunk)
+                perf.add_rows(len(chunk))
+                state['bytes_read'] = raw.bytes_read
+                if streaming:
+                    self.last_row = chunk[-1][0]
+                    self.env.cr.commit()
+                self._report_import_progress(state)
+
+        if streaming:
+            self.last_row = 0
+        state['elapsed'] = time.perf_counter() - state['start']
+        return state
+
+    def _report_import_progress(self, state):
+        """Transmet l'avancement au job d'import en cours d'exécution, le cas échéant"""
+        job_id = self.env.context.get('dynamed_import_job_id')
+        if job_id:
+            self.env['dynamed.dataset.job'].browse(job_id)._update_progress(state)
+
+    def _get_name_map(self, state, model_name):
+        """Retourne {clé: id} pour tous les enregistrements du modèle, chargé en une seule
+        requête au premier appel puis conservé dans ``state``. La clé est le nom normalisé
+        (``name_key``) pour les vocabulaires de référence, le nom sinon."""
+        name_maps = state.setdefault('name_maps', {})
+        if model_name not in name_maps:
+            Model = self.env[model_name]
+            key_field = 'name_key' if 'name_key' in Model._fields else 'name'
+            name_map = {}
+            for record in Model.search_read([], [key_field], order='id'):
+                name_map.setdefault(record[key_field], record['id'])
+            name_maps[model_name] = name_map
+        return name_maps[model_name]
+
+    def _create_missing_names(self, state, model_name, names):
+        """Crée en un seul appel les noms absents du modèle et retourne {nom: id}"""
+        Model = self.env[model_name]
+        name_map = self._get_name_map(state, model_name)
+        count = len(name_map)
+        if 'name_key' in Model._fields:
+            # Vocabulaire de référence : upsert sur le nom normalisé
+            result = Model._upsert_names(names, known=name_map)
+        else:
+            missing = [name for name in dict.fromkeys(names) if name not in name_map]
+            if missing:
+                for record in Model.create([{'name': name} for name in missing]):
+                    name_map[record.name] = record.id
+            result = name_map
+        if len(name_map) > count:
+            state['stats'][model_name] = state['stats'].get(model_name, 0) + len(name_map) - count
+        return result
+
+    def _import_notification(self, title, message, notification_type=None):
+        params = {
+            'title': title,
+            'message': message,
+            'sticky': False,
+        }
+        if notification_type:
+            params['type'] = notification_type
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': params,
+        }
+
+    @staticmethod
+    def _throughput(state):
+        elapsed = state['elapsed']
+        rows = state['stats']['rows']
+        return int(rows / elapsed) if elapsed else rows
+
+    @staticmethod
+    def _same_value(current, value):
+        """Compare une valeur lue (read) à une valeur d'écriture"""
+        if isinstance(value, list):  # [(6, 0, ids)]
+            return set(current) == set(value[0][2])
+        if isinstance(current, tuple):  # Many2one lu : (id, nom)
+            current = current[0]
+        return (current or False) == (value or False)
+
+    # ------------------------------------------------------------------
+    # Molécules
+    # ------------------------------------------------------------------
+
+    def _parse_molecule_rows(self, rows):
+        """Regroupe les lignes du CSV par molécule (la dernière ligne l'emporte, comme
+        des écritures successives) et retourne {nom: {'vals': ..., 'links': {champ: [noms]}}}"""
+        molecules = {}
+        for row in rows:
+            if not row.get('Nom de la molécule'):
+                continue
+
+            molecule_name = row['Nom de la molécule'].strip()
+            entry = molecules.setdefault(molecule_name, {'vals': {}, 'links': {}})
+            entry['vals'] = {
+                'name': molecule_name,
+                'grossesse': row.get('Grossesse', '').strip().upper() == 'TRUE',
+                'allaitement': row.get('Allaitement', '').strip().upper() == 'TRUE',
+                'effet_majeurs': row.get('Effets secondaires majeurs', '').strip(),
             }
-
+            for col_name, (field_name, model_name) in MOLECULE_COLUMNS.items():
+                items = self._split_values(row[col_name]) if row.get(col_name) else []
+                if items:
+                    # Many2one : seule la première valeur est retenue
+                    entry['links'][field_name] = items[:1] if field_name.endswith('_id') else items
+        return molecules
+
+    def _import_molecule_rows(self, rows, state):
+        """Importe un lot de lignes du fichier des molécules
+
+        Les valeurs de référence manquantes et les nouvelles molécules sont créées en un
+        seul appel par modèle, et seules les molécules dont les valeurs changent sont réécrites.
+        """
+        Molecule = self.env['dynamed.molecule']
+        stats = state['stats']
+        molecules = self._parse_molecule_rows(rows)
+
+        # Valeurs de référence : création groupée par modèle
+        for field_name, model_name in MOLECULE_COLUMNS.values():
+            names = [name for entry in molecules.values() for name in entry['links'].get(field_name, [])]
+            name_map = self._create_missing_names(state, model_name, names)
+            for entry in molecules.values():
+                if field_name in entry['links']:
+                    ids = [name_map[name] for name in entry['links'][field_name]]
+                    entry['vals'][field_name] = ids[0] if field_name.endswith('_id') else [(6, 0, ids)]
+
+        # Molécules : création groupée des nouvelles, écriture des seules modifiées
+        molecule_map = self._get_name_map(state, 'dynamed.molecule')
+        new_names = [name for name in molecules if name not in molecule_map]
+        for molecule in Molecule.create([molecules[name]['vals'] for name in new_names]):
+            molecule_map[molecule.name] = molecule.id
+        stats['created_molecules'] = stats.get('created_molecules', 0) + len(new_names)
+
+        existing = Molecule.browse([molecule_map[name] for name in molecules if name not in new_names])
+        read_fields = ['name', 'grossesse', 'allaitement', 'effet_majeurs'] + [
+            field_name for field_name, model_name in MOLECULE_COLUMNS.values()
+        ]
+        for current in existing.read(read_fields):
+            vals = molecules[current['name']]['vals']
+            if any(not self._same_value(current[key], value) for key, value in vals.items() if key != 'name'):
+                Molecule.browse(current['id']).write(vals)
+                stats['updated_molecules'] = stats.get('updated_molecules', 0) + 1
+
+    @instrument()
+    def import_molecules_data(self):
+        """Méthode principale pour l'importation"""
+        try:
+            state = self._import_stream(self._import_molecule_rows)
+        except UserError:
+            raise
         except Exception as e:
             raise UserError(_("Erreur lors de l'importation : %s") % str(e))
 
-
+        stats = state['stats']
+        references = sum(stats.get(model_name, 0) for field_name, model_name in MOLECULE_COLUMNS.values())
+        message = f"""
+               Importation terminée avec succès: {stats['rows']} lignes en {state['elapsed']:.1f} s ({self._throughput(state)} lignes/s)
+               - Molécules créées: {stats.get('created_molecules', 0)}
+               - Molécules mises à jour: {stats.get('updated_molecules', 0)}
+               - Valeurs de référence créées: {references}
+           """
+        return self._import_notification('Succès', message)
+
+    # ------------------------------------------------------------------
+    # Précautions
+    # ------------------------------------------------------------------
+
+    def _import_precaution_rows(self, rows, state):
+        names = [row[0].strip() for row in rows if row and row[0].strip()]
+        self._create_missing_names(state, 'dynamed.precaution', names)
+
+    @instrument()
     def import_precautions(self):
         """
         Méthode pour importer les précautions depuis le fichier CSV attaché
         """
-        self.ensure_one()
-
-        if not self.file:
-            raise UserError(_("Aucun fichier attaché"))
-
         try:
-            # Décoder le fichier
-            file_content = base64.b64decode(self.file).decode('utf-8')
-            csv_file = StringIO(file_content)
-            reader = csv.reader(csv_file, delimiter=',')
-
-            # Passer l'en-tête si présent
-            next(reader, None)
-
-            # Récupérer le modèle des précautions
-            precaution_model = self.env['dynamed.precaution']
-
-            for row in reader:
-                if row and row[0].strip():
-                    name = row[0].strip()
-                    # Rechercher ou créer la précaution
-                    precaution_model.search([('name', '=', name)], limit=1) or \
-                    precaution_model.create({'name': name})
-
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': 'Importation réussie',
-                    'message': 'Les précautions ont été importées avec succès',
-                    'sticky': False,
-                }
-            }
-
+            self._import_stream(self._import_precaution_rows, header=False)
+        except UserError:
+            raise
         except Exception as e:
             raise UserError(_("Erreur lors de l'importation : %s") % str(e))
 
+        return self._import_notification('Importation réussie', 'Les précautions ont été importées avec succès')
+
+    # ------------------------------------------------------------------
+    # Diagnostics et classes médicales
+    # ------------------------------------------------------------------
+
+    def _import_diagnostic_rows(self, rows, state):
+        diagnostics = {}
+        for row in rows:
+            if not row.get('Diagnostic') or not row.get('Classe médicale'):
+                continue
+            classes = [c.strip() for c in row['Classe médicale'].split(',') if c.strip()]
+            diagnostics[row['Diagnostic'].strip()] = classes
+
+        diagnostic_map = self._create_missing_names(state, 'dynamed.diagnostic', diagnostics)
+        class_map = self._create_missing_names(
+            state, 'dynamed.classe.medicale', [name for classes in diagnostics.values() for name in classes]
+        )
+
+        # Mise à jour des relations many2many : une écriture par ensemble de classes
+        by_classes = {}
+        for diagnostic_name, classes in diagnostics.items():
+            class_ids = tuple(dict.fromkeys(class_map[name] for name in classes))
+            by_classes.setdefault(class_ids, []).append(diagnostic_map[diagnostic_name])
+        for class_ids, diagnostic_ids in by_classes.items():
+            self.env['dynamed.diagnostic'].browse(diagnostic_ids).write(
+                {'classe_medicale_ids': [(6, 0, list(class_ids))]}
+            )
+
+    @instrument()
     def import_diagnostics_classes(self):
         """
         Méthode pour importer les diagnostics et classes médicales depuis le fichier CSV
         """
-        self.ensure_one()
-
-        if not self.file:
-            raise UserError(_("Aucun fichier attaché"))
-
         try:
-            # Décoder le fichier
-            file_content = base64.b64decode(self.file).decode('utf-8')
-            csv_file = StringIO(file_content)
-            reader = csv.DictReader(csv_file)
-
-            # Modèles
-            diagnostic_model = self.env['dynamed.diagnostic']
-            classe_model = self.env['dynamed.classe.medicale']
-
-            count_diag = 0
-            count_classes = 0
-
-            for row in reader:
-                if not row.get('Diagnostic') or not row.get('Classe médicale'):
-                    continue
-
-                # Traitement du diagnostic
-                diagnostic_name = row['Diagnostic'].strip()
-                diagnostic = diagnostic_model.search([('name', '=', diagnostic_name)], limit=1)
-
-                if not diagnostic:
-                    diagnostic = diagnostic_model.create({'name': diagnostic_name})
-                    count_diag += 1
-
-                # Traitement des classes médicales
-                classes = [c.strip() for c in row['Classe médicale'].split(',') if c.strip()]
-                class_ids = []
-
-                for class_name in classes:
-                    classe = classe_model.search([('name', '=', class_name)], limit=1)
-                    if not classe:
-                        classe = classe_model.create({'name': class_name})
-                        count_classes += 1
-                    class_ids.append(classe.id)
-
-                # Mise à jour des relations many2many
-                diagnostic.write({'classe_medicale_ids': [(6, 0, class_ids)]})
-
-            message = f"""
-                   Importation terminée avec succès:
-                   - Diagnostics créés/mis à jour: {count_diag}
-                   - Classes médicales créées: {count_classes}
-               """
-
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': 'Importation réussie',
-                    'message': message,
-                    'sticky': False,
-                }
-            }
-
+            state = self._import_stream(self._import_diagnostic_rows)
+        except UserError:
+            raise
         except Exception as e:
             raise UserError(_("Erreur lors de l'importation : %s") % str(e))
 
+        message = f"""
+               Importation terminée avec succès:
+               - Diagnostics créés/mis à jour: {state['stats'].get('dynamed.diagnostic', 0)}
+               - Classes médicales créées: {state['stats'].get('dynamed.classe.medicale', 0)}
+           """
+        return self._import_notification('Importation réussie', message)
+
+    # ------------------------------------------------------------------
+    # Noms commerciaux
+    # ------------------------------------------------------------------
+
+    def _import_nom_commercial_rows(self, rows, state):
+        commercials = {}
+        for row in rows:
+            dci = row.get('DCI (Dénomination Commune Internationale)', '').strip()
+            nom_commercial = row.get('Nom Commercial', '').strip()
+
+            if not dci or not nom_commercial:
+                continue
+
+            commercials[(nom_commercial, dci)] = {
+                'name': nom_commercial,
+                'dci': dci,
+                'dosage': row.get('Dosage', '').strip(),
+                'forme_pharmaceutique': row.get('Forme Pharmaceutique', '').strip(),
+                'conditionnement': row.get('Conditionnement', '').strip(),
+            }
+
+        molecule_map = self._create_missing_names(state, 'dynamed.molecule', [dci for name, dci in commercials])
+
+        for vals in commercials.values():
+            vals['molecule_id'] = molecule_map[vals.pop('dci')]
+        if not commercials:
+            return
+
+        # Noms commerciaux du lot déjà en base (le plus ancien par nom et molécule) : la
+        # mémoire reste bornée par le lot
+        NomCommercial = self.env['nom.commercial']
+        NomCommercial.flush_model()
+        names, molecule_ids = zip(*((vals['name'], vals['molecule_id']) for vals in commercials.values()))
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (commercial.name, commercial.molecule_id)
+                   commercial.id, commercial.name, commercial.molecule_id, commercial.dosage,
+                   commercial.forme_pharmaceutique, commercial.conditionnement
+              FROM nom_commercial commercial
+              JOIN unnest(%s::varchar[], %s::int[]) AS pair(name, molecule_id)
+                ON commercial.name = pair.name
+               AND commercial.molecule_id = pair.molecule_id
+          ORDER BY commercial.name, commercial.molecule_id, commercial.id
+        """, [list(names), list(molecule_ids)])
+        existing = {
+            (name, molecule_id): {
+                'id': record_id,
+                'dosage': dosage,
+                'forme_pharmaceutique': forme,
+                'conditionnement': conditionnement,
+            }
+            for record_id, name, molecule_id, dosage, forme, conditionnement in self.env.cr.fetchall()
+        }
+
+        to_create = []
+        for vals in commercials.values():
+            current = existing.get((vals['name'], vals['molecule_id']))
+            if not current:
+                to_create.append(vals)
+            elif any((current[key] or '') != vals[key] for key in ('dosage', 'forme_pharmaceutique', 'conditionnement')):
+                NomCommercial.browse(current['id']).write(vals)
+        NomCommercial.create(to_create)
+
+    @instrument()
     def import_nom_commercial(self):
         """Méthode pour importer les noms commerciaux depuis CSV"""
         if not self.file:
             raise UserError(_("Aucun fichier sélectionné"))
 
         try:
-            file_content = base64.b64decode(self.file).decode('utf-8-sig')
-            csv_reader = csv.DictReader(StringIO(file_content), delimiter=',')
-
-            for row in csv_reader:
-                # Traitement de chaque ligne
-                dci = row.get('DCI (Dénomination Commune Internationale)', '').strip()
-                nom_commercial = row.get('Nom Commercial', '').strip()
-
-                if not dci or not nom_commercial:
-                    continue
-
-                # Gestion de la molécule (dynamed.molecule)
-                molecule = self.env['dynamed.molecule'].search([('name', '=', dci)], limit=1)
-                if not molecule:
-                    molecule = self.env['dynamed.molecule'].create({'name': dci})
-
-                # Gestion du nom commercial
-                commercial = self.env['nom.commercial'].search([
-                    ('name', '=', nom_commercial),
-                    ('molecule_id', '=', molecule.id)
-                ], limit=1)
-
-                vals = {
-                    'name': nom_commercial,
-                    'dosage': row.get('Dosage', '').strip(),
-                    'forme_pharmaceutique': row.get('Forme Pharmaceutique', '').strip(),
-                    'conditionnement': row.get('Conditionnement', '').strip(),
-                    'molecule_id': molecule.id,
-                }
-
-                if commercial:
-                    commercial.write(vals)
-                else:
-                    self.env['nom.commercial'].create(vals)
-
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': _('Import réussi'),
-                    'message': _('Les noms commerciaux ont été importés avec succès'),
-                    'type': 'success',
-                    'sticky': False,
-                }
-            }
-
+            self._import_stream(self._import_nom_commercial_rows, encoding='utf-8-sig')
+        except UserError:
+            raise
         except Exception as e:
             raise UserError(_("Erreur lors de l'import des noms commerciaux: %s") % str(e))
 
-    def _get_or_create_medicament(self, name, model_keys=['medicaments_actuels', 'molecule']):
-        """Crée ou récupère un médicament dans tous les modèles nécessaires"""
-        res = {}
-        for key in model_keys:
-            model = self.env[f'dynamed.{key}']
-            record = model.search([('name', '=', name)], limit=1)
-            if not record:
-                record = model.create({'name': name})
-            res[key] = record
-        return res
+        return self._import_notification(
+            _('Import réussi'), _('Les noms commerciaux ont été importés avec succès'), 'success'
+        )
 
-    def import_interactions_data(self):
-        """Méthode optimisée pour l'importation"""
-        self.ensure_one()
+    # ------------------------------------------------------------------
+    # Interactions
+    # ------------------------------------------------------------------
 
-        if not self.file:
-            raise UserError(_("Aucun fichier attaché"))
+    def _get_parse_workers(self):
+        """Processus d'analyse des interactions : un seul hors du mode prefork, où le pool
+        serait créé par fork depuis un processus multi-thread (serveur ou tâches planifiées)"""
+        if not config['workers']:
+            return 1
+        return self.parse_workers
 
-        try:
-            file_content = base64.b64decode(self.file).decode('utf-8')
-            csv_file = StringIO(file_content)
-            reader = csv.DictReader(csv_file)
-
-            Interaction = self.env['dynamed.interaction']
-            Classe = self.env['dynamed.classe.medicale']
-
-            for row in reader:
-                if not row.get('Médicaments 1'):
-                    continue
-
-                # Traitement Médicament 1 (colonne principale)
-                med1_data = self._get_or_create_medicament(row['Médicaments 1'].strip())
-
-                # Traitement Classe médicale
-                classe = None
-                if row.get('Class'):
-                    classe = Classe.search([('name', '=', row['Class'].strip())], limit=1)
-                    if not classe:
-                        classe = Classe.create({'name': row['Class'].strip()})
-
-                # Traitement Médicaments 2 (colonne des interactions)
-                if row.get('Médicaments'):
-                    for med2_name in self._split_values(row['Médicaments']):
-                        med2_data = self._get_or_create_medicament(med2_name)
-
-                        # Création interaction si elle n'existe pas
-                        domain = [
-                            ('medicament_1_id', '=', med1_data['molecule'].id),
-                            ('medicament_2_id', '=', med2_data['molecule'].id),
-                            ('classe_medicale_id', '=', classe.id if classe else False)
-                        ]
-
-                        if not Interaction.search(domain, limit=1):
-                            Interaction.create({
-                                'medicament_1_id': med1_data['molecule'].id,
-                                'medicament_2_id': med2_data['molecule'].id,
-                                'classe_medicale_id': classe.id if classe else False,
-                                'type_interaction': row.get('Type d\'Interaction', '').strip()
-                            })
-
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': 'Succès',
-                    'message': 'Importation des interactions et médicaments terminée',
-                    'sticky': False,
-                }
-            }
+    def _import_interaction_rows(self, rows, state, parse):
+        """Importe un lot de lignes du fichier des interactions
 
+        L'analyse et le dédoublonnage des lignes sont confiés à ``parse``, réparti sur
+        plusieurs processus pour les gros fichiers ; la phase d'écriture crée ensuite en
+        bloc les médicaments, classes et interactions manquants.
+        """
+        interactions, medicaments, classes = parse([
+            (
+                row['Médicaments 1'].strip(),
+                (row.get('Class') or '').strip() or False,
+                row.get('Médicaments') or '',
+                (row.get('Type d\'Interaction') or '').strip(),
+            )
+            for row in rows if row.get('Médicaments 1')
+        ])
+
+        # Chaque médicament existe à la fois comme médicament actuel et comme molécule
+        self._create_missing_names(state, 'dynamed.medicaments_actuels', medicaments)
+        molecule_map = self._create_missing_names(state, 'dynamed.molecule', medicaments)
+        class_map = self._create_missing_names(state, 'dynamed.classe.medicale', classes)
+
+        # Clé canonique : A/B et B/A sont la même interaction (index unique)
+        candidates = {}
+        for (med1_name, med2_name, class_name), type_interaction in interactions.items():
+            med1_id, med2_id = molecule_map[med1_name], molecule_map[med2_name]
+            class_id = class_map[class_name] if class_name else 0
+            candidates.setdefault((min(med1_id, med2_id), max(med1_id, med2_id), class_id), (
+                med1_id, med2_id, type_interaction,
+            ))
+        if not candidates:
+            return
+
+        # Paires du lot déjà en base, par l'index unique : la mémoire reste bornée par le lot
+        Interaction = self.env['dynamed.interaction']
+        Interaction.flush_model()
+        min_ids, max_ids, class_ids = zip(*candidates)
+        self.env.cr.execute("""
+            SELECT interaction.molecule_min_id, interaction.molecule_max_id,
+                   COALESCE(interaction.classe_medicale_id, 0)
+              FROM dynamed_interaction interaction
+              JOIN unnest(%s::int[], %s::int[], %s::int[]) AS pair(min_id, max_id, class_id)
+                ON interaction.molecule_min_id = pair.min_id
+               AND interaction.molecule_max_id = pair.max_id
+               AND COALESCE(interaction.classe_medicale_id, 0) = pair.class_id
+        """, [list(min_ids), list(max_ids), list(class_ids)])
+        existing = set(self.env.cr.fetchall())
+
+        to_create = [
+            {
+                'medicament_1_id': med1_id,
+                'medicament_2_id': med2_id,
+                'classe_medicale_id': key[2] or False,
+                'type_interaction': type_interaction,
+            }
+            for key, (med1_id, med2_id, type_interaction) in candidates.items()
+            if key not in existing
+        ]
+        for batch in iter_chunks(to_create, INSERT_BATCH_SIZE):
+            Interaction.create(batch)
+            Interaction.invalidate_model()
+        state['stats']['dynamed.interaction'] = state['stats'].get('dynamed.interaction', 0) + len(to_create)
+
+    @instrument()
+    def import_interactions_data(self):
+        """Méthode optimisée pour l'importation"""
+        try:
+            workers = self._get_parse_workers()
+            # Le parallélisme dépend du nombre de lignes restant à importer, pas de la taille des lots
+            total_rows = 0
+            if workers != 1:
+                total_rows = count_lines(self._open_file_stream()[0]) - (self.last_row if self.streaming else 0)
+            with interaction_parser(workers, total_rows) as parse:
+                self._import_stream(functools.partial(self._import_interaction_rows, parse=parse))
+        except UserError:
+            raise
         except Exception as e:
-            raise UserError(_("Erreur lors de l'importation : %s") % str(e))
\ No newline at end of file
+            raise UserError(_("Erreur lors de l'importation : %s") % str(e))
+
+        return self._import_notification('Succès', 'Importation des interactions et médicaments terminée')
@@ -0,0 +1,131 @@
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from odoo import models, fields, api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+# Un job « en cours » sans signe de vie depuis ce délai est considéré comme interrompu
+# (worker arrêté ou tué) : l'avancement est enregistré après chaque lot
+JOB_STALE_TIMEOUT = timedelta(minutes=30)
+
+
+class DataSetJob(models.Model):
+    _name = 'dynamed.dataset.job'
+    _description = "Import de DataSet en arrière-plan"
+    _order = 'id desc'
+
+    dataset_id = fields.Many2one('dynamed.dataset', string='DataSet', required=True, ondelete='cascade', index=True)
+    method = fields.Selection([
+        ('import_molecules_data', 'Molécules'),
+        ('import_diagnostics_classes', 'Diagnostics'),
+        ('import_nom_commercial', 'Noms commerciaux'),
+        ('import_interactions_data', 'Interactions'),
+        ('import_precautions', 'Précautions'),
+    ], string="Type d'import", required=True)
+    user_id = fields.Many2one('res.users', string='Demandé par', default=lambda self: self.env.user)
+    state = fields.Selection([
+        ('queued', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminé'),
+        ('failed', 'Échec'),
+    ], string='État', default='queued', required=True, index=True)
+    date_start = fields.Datetime(string='Début')
+    date_end = fields.Datetime(string='Fin')
+    date_heartbeat = fields.Datetime(string='Dernier signe de vie', readonly=True)
+    rows_processed = fields.Integer(string='Lignes traitées')
+    progress = fields.Float(string='Avancement (%)')
+    throughput = fields.Float(string='Débit (lignes/s)')
+    message = fields.Text(string='Résultat')
+    error_log = fields.Text(string="Journal d'erreurs")
+
+    @api.model
+    def _cron_run_jobs(self):
+        """Exécute les imports en attente, un par un, jusqu'à vider la file.
+
+        Chaque job est réservé avec ``FOR UPDATE SKIP LOCKED`` : plusieurs workers
+        peuvent exécuter la tâche planifiée sans traiter deux fois le même import.
+        """
+        self._recover_stale_jobs()
+        self.env.cr.commit()
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM dynamed_dataset_job
+                 WHERE state = 'queued'
+              ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """)
+            row = self.env.cr.fetchone()
+            if not row:
+                return
+            job = self.browse(row[0])
+            now = fields.Datetime.now()
+            job.write({'state': 'running', 'date_start': now, 'date_heartbeat': now})
+            self.env.cr.commit()
+            job._run()
+
+    @api.model
+    def _recover_stale_jobs(self):
+        """Passe en échec les jobs « en cours » dont le worker ne donne plus signe de vie,
+        pour que leur DataSet puisse être réimporté (l'import en flux reprend au dernier lot
+        validé)"""
+        self.env.cr.execute("""
+            SELECT id FROM dynamed_dataset_job
+             WHERE state = 'running'
+               AND COALESCE(date_heartbeat, date_start, create_date) < %s
+               FOR UPDATE SKIP LOCKED
+        """, [fields.Datetime.now() - JOB_STALE_TIMEOUT])
+        stale = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if stale:
+            _logger.warning("Imports de DataSet interrompus, passés en échec : %s", stale.ids)
+            stale.write({
+                'state': 'failed',
+                'date_end': fields.Datetime.now(),
+                'error_log': "Import interrompu : aucun avancement depuis plus de %d minutes."
+                             % (JOB_STALE_TIMEOUT.total_seconds() // 60),
+            })
+        return stale
+
+    def _run(self):
+        self.ensure_one()
+        dataset = self.dataset_id.with_user(self.user_id or SUPERUSER_ID).with_context(
+            dynamed_import_job_id=self.id,
+        )
+        try:
+            action = getattr(dataset, self.method)()
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.exception("Import %s du DataSet %s en échec", self.method, self.dataset_id.id)
+            self.write({
+                'state': 'failed',
+                'date_end': fields.Datetime.now(),
+                'error_log': f"{e}\n\n{traceback.format_exc()}",
+            })
+        else:
+            # Valider l'import avant de mettre à jour le job : l'avancement a été écrit
+            # par une autre transaction, postérieure à l'instantané de celle-ci
+            self.env.cr.commit()
+            self.write({
+                'state': 'done',
+                'date_end': fields.Datetime.now(),
+                'progress': 100.0,
+                'message': (action or {}).get('params', {}).get('message', ''),
+            })
+        self.env.cr.commit()
+
+    def _update_progress(self, state):
+        """Enregistre l'avancement dans une transaction séparée, pour qu'il soit visible
+        pendant que l'import est encore en cours dans la transaction principale"""
+        elapsed = time.perf_counter() - state['start']
+        rows = state['stats']['rows']
+        values = {
+            'rows_processed': rows,
+            'progress': min(100.0 * state['bytes_read'] / state['size'], 100.0) if state['size'] else 0.0,
+            'throughput': rows / elapsed if elapsed else 0.0,
+            'date_heartbeat': fields.Datetime.now(),
+        }
+        with self.env.registry.cursor() as cr:
+            self.with_env(self.env(cr=cr, user=SUPERUSER_ID)).write(values)
@@ -1,13 +1,45 @@
-from odoo import models, fields, api,_
+import logging
+
+from markupsafe import Markup
+
+from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
 from odoo.exceptions import UserError
 
-from odoo.tools import html_sanitize
+from odoo.tools.sql import create_index, index_exists
+
+_logger = logging.getLogger(__name__)
+
+# Notifications des administrateurs, compilées une fois : les valeurs sont échappées par Markup.format
+ADMIN_NOTIFICATION_TEMPLATES = {
+    'inscription': {
+        'subject': "🆕 Nouvelle inscription - Dr. {name}",
+        'body': Markup(
+            "<div style='padding:10px;border-left:4px solid #875A7B'>"
+            "<p><b>Nouvelle inscription</b></p>"
+            "<p>Médecin: {name}</p>"
+            "<p>Email: {email}</p>"
+            "<p><a href='{record_url}'>Voir la demande</a></p>"
+            "</div>"
+        ),
+    },
+    'paiement': {
+        'subject': "💰 Paiement à valider - Dr. {name}",
+        'body': Markup(
+            "<div style='padding:10px;border-left:4px solid #FFC107'>"
+            "<p><b>Nouveau paiement</b></p>"
+            "<p>Médecin: {name}</p>"
+            "<p>Date: {date}</p>"
+            "<p><a href='{record_url}'>Vérifier le paiement</a></p>"
+            "</div>"
+        ),
+    },
+}
 
 class InscriptionMedecin(models.Model):
     _name = 'dynamed.inscription.medecin'
-    _inherit = ['mail.thread', 'mail.activity.mixin']  # Add these inherits
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'dynamed.payment.proof.mixin']  # Add these inherits
 
     _description = 'Demande d\'inscription Médecin'
 
@@ -16,7 +48,6 @@ class InscriptionMedecin(models.Model):
     email = fields.Char(string='Email', required=True)
     type_pratique = fields.Selection([('prive', 'Privé'), ('public', 'Public')], string='Type de pratique')
     specialite_id = fields.Many2one('dynamed.specialite', string='Spécialité')
-    preuve_paiement = fields.Binary(string='Preuve de paiement', widget="image")
     # Add to your states
     statut = fields.Selection([
         ('en_attente', 'En attente'),
@@ -47,97 +78,68 @@ class InscriptionMedecin(models.Model):
 
     rejection_reason = fields.Text(string="Raison de rejet")
 
+    @api.model
+    def _get_admin_partner_ids(self):
+        """Partenaires des administrateurs actifs, en une requête indexée sur les membres du groupe"""
+        admin_group = self.env.ref('dynamed.group_dynamed_admin', raise_if_not_found=False)
+        if not admin_group:
+            return ()
+        self.env['res.users'].flush_model(['active', 'partner_id', 'groups_id'])
+        self.env.cr.execute("""
+            SELECT users.partner_id
+              FROM res_groups_users_rel membership
+              JOIN res_users users ON users.id = membership.uid
+             WHERE membership.gid = %s
+               AND users.active
+        """, [admin_group.id])
+        return tuple(row[0] for row in self.env.cr.fetchall())
+
     def _notify_admins(self, event_type="inscription"):
         """
         Notify admin group about registration/payment events
         Returns: mail.message record or False
         """
         try:
-            # 1. Get Odoo Bot as sender with sudo
-            bot = self.env.ref('base.user_root').sudo()
-            if not bot:
-                print("Odoo Bot user not found in system")
-                return False
-
-            # 2. Get admin group members with sudo
-            admin_group = self.env.ref('dynamed.group_dynamed_admin').sudo()
-            if not admin_group:
-                print("Admin group not found!")
+            template = ADMIN_NOTIFICATION_TEMPLATES.get(event_type)
+            if not template:
+                _logger.warning("No template found for event type: %s", event_type)
                 return False
 
-            admin_users = admin_group.users.filtered(lambda u: u.active)
-            if not admin_users:
-                print("No active users in admin group")
+            partner_ids = self._get_admin_partner_ids()
+            if not partner_ids:
+                _logger.warning("No active users in admin group")
                 return False
 
-            # 3. Prepare message content
+            bot = self.env.ref('base.user_root').sudo()
             base_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url')
-            record_url = f"{base_url}/web#id={self.id}&model=dynamed.inscription.medecin"
-
-            templates = {
-                'inscription': {
-                    'subject': f"🆕 Nouvelle inscription - Dr. {self.name}",
-                    'body': html_sanitize(f"""
-                        <div style='padding:10px;border-left:4px solid #875A7B'>
-                            <p><b>Nouvelle inscription</b></p>
-                            <p>Médecin: {self.name}</p>
-                            <p>Email: {self.email}</p>
-                            <p><a href='{record_url}'>Voir la demande</a></p>
-                        </div>
-                    """),
-                    'subtype_id': self.env.ref('mail.mt_comment').id,
-                },
-                'paiement': {
-                    'subject': f"💰 Paiement à valider - Dr. {self.name}",
-                    'body': html_sanitize(f"""
-                        <div style='padding:10px;border-left:4px solid #FFC107'>
-                            <p><b>Nouveau paiement</b></p>
-                            <p>Médecin: {self.name}</p>
-                            <p>Date: {fields.Datetime.now()}</p>
-                            <p><a href='{record_url}'>Vérifier le paiement</a></p>
-                        </div>
-                    """),
-                    'subtype_id': self.env.ref('mail.mt_comment').id,
-                }
+            values = {
+                'name': self.name,
+                'email': self.email,
+                'date': fields.Datetime.now(),
+                'record_url': f"{base_url}/web#id={self.id}&model=dynamed.inscription.medecin",
             }
 
-            template = templates.get(event_type)
-            if not template:
-                print(f"No template found for event type: {event_type}")
-                return False
-
-            # 4. Create message with sudo
-            print("Creating new message...")
             message = self.with_user(bot).sudo().message_post(
-                body=template['body'].strip(),
-                subject=template['subject'],
+                body=template['body'].format(**values),
+                subject=template['subject'].format(**values),
                 message_type="comment",
-                subtype_id=template['subtype_id'],
+                subtype_xmlid='mail.mt_comment',
                 email_from=bot.email,
                 email_layout_xmlid='mail.mail_notification_light',
             )
-            print(f"Created message ID: {message.id}")
 
-            # 5. Create notifications - simplified approach
-            for user in admin_users:
-                try:
-                    print(f"Creating notification for {user.name}")
-                    self.env['mail.notification'].sudo().create({
-                        'mail_message_id': message.id,
-                        'res_partner_id': user.partner_id.id,
-                        'notification_type': 'inbox',
-                        'is_read': False,
-                    })
-                except Exception as e:
-                    print(f"Failed to create notification for {user.name}: {str(e)}")
-                    continue
+            # Une seule création pour toutes les notifications
+            self.env['mail.notification'].sudo().create([{
+                'mail_message_id': message.id,
+                'res_partner_id': partner_id,
+                'notification_type': 'inbox',
+                'is_read': False,
+            } for partner_id in partner_ids])
 
             return message
 
-        except Exception as e:
-            print(f"Notification failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            _logger.exception("Admin notification failed for inscription %s", self.id)
             return False
 
     def _notify_admin_channel(self, event_type):
@@ -205,8 +207,10 @@ class InscriptionMedecin(models.Model):
 
     def _send_rejection_email(self):
         template = self.env.ref('dynamed.email_template_payment_rejected')
+        dispatcher = self.env['dynamed.mail.dispatcher']
         for record in self:
-            template.with_context(rejection_reason=record.rejection_reason).send_mail(record.id, force_send=True)
+            # Le contexte reste fourni pour les modèles d'email déjà installés qui le lisent
+            dispatcher._queue(template.with_context(rejection_reason=record.rejection_reason), record)
 
     def _compute_login_url(self):
 
@@ -227,9 +231,9 @@ class InscriptionMedecin(models.Model):
             print(f"Processing record {record.id}")
             print(f"Current status: {record.statut}")
             print(f"Payment valid: {record.payment_valide}")
-            print(f"Has proof: {bool(record.preuve_paiement)}")
+            print(f"Has proof: {bool(record.preuve_paiement_attachment_id)}")
 
-            if not record.payment_valide and record.preuve_paiement:
+            if not record.payment_valide and record.preuve_paiement_attachment_id:
                 try:
                     record.write({
                         'payment_valide': True,
@@ -241,7 +245,7 @@ class InscriptionMedecin(models.Model):
                 except Exception as e:
                     print(f"Error updating record: {str(e)}")
                     raise
-            elif not record.preuve_paiement:
+            elif not record.preuve_paiement_attachment_id:
                 msg = "Aucune preuve de paiement n'a été uploadée."
                 print(msg)
                 raise ValidationError(msg)
@@ -249,9 +253,8 @@ class InscriptionMedecin(models.Model):
                 print("Payment already validated")
 
     def _send_payment_confirmation(self):
-        self.ensure_one()
         template = self.env.ref('dynamed.email_template_account_activated')
-        template.send_mail(self.id, force_send=True)
+        self.env['dynamed.mail.dispatcher']._queue(template, self)
 
     def action_approve(self):
         for record in self:
@@ -263,6 +266,7 @@ class InscriptionMedecin(models.Model):
             })
             # Create doctor account immediately for trial
             record.action_create_medecin_trial()
+        self._schedule_trial_check()
 
     def action_create_medecin_trial(self):
         """Create doctor account for trial period (without payment proof)"""
@@ -306,7 +310,7 @@ class InscriptionMedecin(models.Model):
     def action_confirm_payment(self):
         """Confirm payment and convert trial account to full account"""
         for record in self:
-            if record.medecin_id and record.statut == 'essai' and record.preuve_paiement:
+            if record.medecin_id and record.statut == 'essai' and record.preuve_paiement_attachment_id:
                 # Remove trial group and add regular doctor group
                 record.medecin_id.user_id.write({
                     'groups_id': [
@@ -318,95 +322,79 @@ class InscriptionMedecin(models.Model):
                 record.medecin_id.write({
                     'en_essai': False,
                     'date_fin_essai': False,
-                    'preuve_paiement': record.preuve_paiement
+                    'preuve_paiement_attachment_id': record.preuve_paiement_attachment_id.id
                 })
                 record.write({'statut': 'medecin_cree', 'est_suspendu': False})
 
-    def check_trial_expiration(self):
-        """Check all trial doctors and suspend those whose trial has expired"""
-        print("\n=== STARTING TRIAL EXPIRATION CHECK ===")
-        print(f"Current time: {datetime.now()}")
-
-        # Get the outgoing mail server (replace with your server ID or search logic)
-        mail_server = self.env['ir.mail_server'].search([], limit=1)
-        if not mail_server:
-            print("⚠️ Warning: No outgoing mail server configured!")
-            return False
-
-        # Find expired trial records
-        expired_records = self.search([
-            ('statut', '=', 'essai'),
-            ('date_fin_essai', '<', datetime.now()),
-            ('est_suspendu', '=', False)
-        ])
-
-        print(f"Found {len(expired_records)} expired trial records to process")
-
-        for i, record in enumerate(expired_records, 1):
-            print(f"\nProcessing record {i}/{len(expired_records)}")
-            print(f"Record ID: {record.id}")
-            print(f"Doctor Name: {record.name}")
-            print(f"Email: {record.email}")
-            print(f"Trial End Date: {record.date_fin_essai}")
-
-            if not record.medecin_id:
-                print("⚠️ Warning: No associated medecin record found!")
-                continue
-
-            print("\nBefore changes:")
-            print(f"  User active status: {record.medecin_id.user_id.active}")
-            print(f"  Inscription suspended flag: {record.est_suspendu}")
-            print(f"  Medecin suspended flag: {record.medecin_id.est_suspendu}")
-
-            try:
-                # Update records
-                record.write({
-                    'est_suspendu': True,
-                    'statut': 'rejete'
-                })
-                record.medecin_id.write({
-                    'est_suspendu': True,
-                    'en_essai': False,
-                    'date_suspension': datetime.now()
-                })
-                record.medecin_id.user_id.write({'active': False})
+    def init(self):
+        super().init()
+        # Index du balayage des périodes d'essai expirées (check_trial_expiration)
+        if not index_exists(self.env.cr, 'dynamed_inscription_medecin_trial_idx'):
+            create_index(
+                self.env.cr, 'dynamed_inscription_medecin_trial_idx', self._table,
+                ['statut', 'est_suspendu', 'date_fin_essai'],
+            )
 
-                print("\nAfter changes:")
-                print(f"  User active status: {record.medecin_id.user_id.active}")
-                print(f"  Inscription suspended flag: {record.est_suspendu}")
-                print(f"  Medecin suspended flag: {record.medecin_id.est_suspendu}")
+    @api.model
+    def _trial_domain(self):
+        return [('statut', '=', 'essai'), ('est_suspendu', '=', False)]
 
-                # Send notification email
-                print("\nSending suspension notice...")
-                try:
-                    base_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url')
-                    payment_url = f"{base_url}/medecin/upload/payment"
-
-                    email_template = self.env.ref('dynamed.email_template_trial_expired')
-                    if email_template:
-                        # Send with specific mail server and context
-                        email_template.with_context({
-                            'default_mail_server_id': mail_server.id,
-                            'doctor_name': record.name,
-                            'trial_end_date': record.date_fin_essai.strftime('%Y-%m-%d'),
-                        }).send_mail(record.id, force_send=True)
-
-                        print(f"✅ Email sent to {record.email} using server {mail_server.name}")
-                    else:
-                        print("⚠️ Email template not found!")
-
-                except Exception as e:
-                    print(f"❌ Email sending failed: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+    def check_trial_expiration(self):
+        """Check all trial doctors and suspend those whose trial has expired"""
+        now = fields.Datetime.now()
+        expired_records = self.search(self._trial_domain() + [('date_fin_essai', '<', now)])
+        without_medecin = expired_records.filtered(lambda record: not record.medecin_id)
+        if without_medecin:
+            _logger.warning("Périodes d'essai expirées sans médecin associé : %s", without_medecin.ids)
+        expired_records -= without_medecin
+
+        if expired_records:
+            # Suspension ensembliste : une écriture par modèle pour tout le lot
+            expired_records.write({
+                'est_suspendu': True,
+                'statut': 'rejete'
+            })
+            expired_records.medecin_id.write({
+                'est_suspendu': True,
+                'en_essai': False,
+                'date_suspension': now,
+            })
+            expired_records.medecin_id.user_id.write({'active': False})
+
+            # Les avis sont générés en une passe et envoyés en arrière-plan
+            email_template = self.env.ref('dynamed.email_template_trial_expired', raise_if_not_found=False)
+            if email_template:
+                mail_server = self.env['ir.mail_server'].search([], limit=1)
+                email_values = {'mail_server_id': mail_server.id} if mail_server else None
+                self.env['dynamed.mail.dispatcher']._queue(email_template, expired_records, email_values)
+            else:
+                _logger.warning("Modèle d'email d'expiration de la période d'essai introuvable")
 
-            except Exception as e:
-                print(f"❌ Error processing record {record.id}: {str(e)}")
-                continue
+            _logger.info("%s compte(s) en période d'essai suspendu(s)", len(expired_records))
 
-        print("\n=== TRIAL EXPIRATION CHECK COMPLETE ===")
+        self._schedule_trial_check()
         return True
 
+    @api.model
+    def _schedule_trial_check(self):
+        """Programme la prochaine vérification à la prochaine fin de période d'essai"""
+        next_expiry = self.search(self._trial_domain() + [('date_fin_essai', '!=', False)],
+                                  order='date_fin_essai', limit=1).date_fin_essai
+        if not next_expiry:
+            return
+        now = fields.Datetime.now()
+        call_at = max(next_expiry, now)
+        cron = self.env.ref('dynamed.ir_cron_check_trial_expiration').sudo()
+        # Un déclenchement à venir, au plus tard à cette échéance, suffit (les déclenchements
+        # passés sont supprimés à la fin de l'exécution en cours de la tâche)
+        if self.env['ir.cron.trigger'].sudo().search_count([
+            ('cron_id', '=', cron.id),
+            ('call_at', '>=', now),
+            ('call_at', '<=', call_at),
+        ], limit=1):
+            return
+        cron._trigger(call_at)
+
     def action_reject(self):
         self.write({'statut': 'rejete'})
 
@@ -453,7 +441,7 @@ class InscriptionMedecin(models.Model):
                     'user_id': user.id,  # Link to the created user
                     'type_pratique': record.type_pratique,
                     'specialite_id': record.specialite_id.id,
-                    'preuve_paiement': record.preuve_paiement,
+                    'preuve_paiement_attachment_id': record.preuve_paiement_attachment_id.id,
                 })
 
                 # Update the InscriptionMedecin record
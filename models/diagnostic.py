@@ -2,6 +2,7 @@ from odoo import models, fields, api
 
 class Diagnostic(models.Model):
     _name = 'dynamed.diagnostic'
+    _inherit = ['dynamed.knowledge.mixin', 'dynamed.vocabulary.mixin', 'dynamed.sync.mixin']
     _description = 'Diagnostics médicaux'
     _order = 'name asc'
 
@@ -11,3 +12,68 @@ class Diagnostic(models.Model):
         string='Classes médicales associées',
         help='Classes de médicaments recommandées'
     )
+    candidate_ids = fields.One2many('dynamed.diagnostic.candidate', 'diagnostic_id', string='Candidates')
+    candidate_molecule_ids = fields.Many2many(
+        'dynamed.molecule',
+        string='Molécules candidates',
+        compute='_compute_candidate_molecule_ids',
+        help='Molécules des classes médicales associées',
+    )
+    candidate_count = fields.Integer(string='Nombre de molécules candidates', compute='_compute_candidate_molecule_ids')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        diagnostics = super().create(vals_list)
+        if any(vals.get('classe_medicale_ids') for vals in vals_list):
+            self.env['dynamed.diagnostic.candidate']._rebuild(diagnostic_ids=diagnostics.ids)
+        return diagnostics
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'classe_medicale_ids' in vals:
+            self.env['dynamed.diagnostic.candidate']._rebuild(diagnostic_ids=self.ids)
+        return res
+
+    # La table des candidates est écrite en SQL par _rebuild, qui invalide ces champs
+    @api.depends('candidate_ids.molecule_id')
+    def _compute_candidate_molecule_ids(self):
+        candidates = self.env['dynamed.diagnostic.candidate'].search_read(
+            [('diagnostic_id', 'in', self.ids)], ['diagnostic_id', 'molecule_id'],
+        )
+        by_diagnostic = {}
+        for candidate in candidates:
+            by_diagnostic.setdefault(candidate['diagnostic_id'][0], []).append(candidate['molecule_id'][0])
+        for diagnostic in self:
+            molecule_ids = by_diagnostic.get(diagnostic.id, [])
+            diagnostic.candidate_molecule_ids = [(6, 0, molecule_ids)]
+            diagnostic.candidate_count = len(molecule_ids)
+
+    def get_candidate_molecules(self, limit=80, offset=0):
+        """
+        Molécules que le diagnostic rend éligibles, par ordre alphabétique, page par page :
+        une seule requête sur la table des candidates, total compris.
+        """
+        self.ensure_one()
+        Molecule = self.env['dynamed.molecule']
+        Molecule.check_access_rights('read')
+        Molecule.flush_model(['name'])
+        self.env.cr.execute("""
+            SELECT molecule.id, molecule.name, COUNT(*) OVER ()
+              FROM dynamed_diagnostic_candidate candidate
+              JOIN dynamed_molecule molecule ON molecule.id = candidate.molecule_id
+             WHERE candidate.diagnostic_id = %s
+          ORDER BY molecule.name, molecule.id
+             LIMIT %s OFFSET %s
+        """, [self.id, limit, offset])
+        rows = self.env.cr.fetchall()
+        if rows:
+            total = rows[0][2]
+        else:
+            # Page au-delà de la fin : le total n'est pas porté par une ligne
+            total = self.env['dynamed.diagnostic.candidate'].search_count([('diagnostic_id', '=', self.id)]) if offset else 0
+        return {
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'results': [{'id': molecule_id, 'name': name} for molecule_id, name, __ in rows],
+        }
@@ -0,0 +1,76 @@
+from odoo import models, fields, api
+from odoo.tools.sql import create_unique_index, index_exists
+
+
+class DiagnosticCandidate(models.Model):
+    """
+    Molécules candidates de chaque diagnostic : celles qui partagent au moins une classe
+    médicale avec lui. Table matérialisée du graphe diagnostic → classe → molécule, tenue
+    à jour par les diagnostics, les classes et les molécules (``_rebuild``) ; le scoring
+    des consultations y lit ses candidates en une seule recherche indexée.
+    """
+    _name = 'dynamed.diagnostic.candidate'
+    _description = 'Molécule candidate pour un diagnostic'
+    _order = 'diagnostic_id, molecule_id'
+    _log_access = False
+
+    diagnostic_id = fields.Many2one(
+        'dynamed.diagnostic', string='Diagnostic', required=True, ondelete='cascade', readonly=True,
+    )
+    molecule_id = fields.Many2one(
+        'dynamed.molecule', string='Molécule', required=True, ondelete='cascade', index=True, readonly=True,
+    )
+
+    def init(self):
+        super().init()
+        cr = self.env.cr
+        if index_exists(cr, 'dynamed_diagnostic_candidate_uniq'):
+            return
+        # L'index unique (diagnostic, molécule) sert aussi la recherche par diagnostic
+        create_unique_index(cr, 'dynamed_diagnostic_candidate_uniq', self._table, ['diagnostic_id', 'molecule_id'])
+        # Première installation : matérialiser le graphe existant
+        self._rebuild()
+
+    @api.model
+    def _rebuild(self, diagnostic_ids=None, molecule_ids=None):
+        """
+        Recalcule les candidates des diagnostics ``diagnostic_ids`` et des molécules
+        ``molecule_ids`` (toute la table si aucun des deux n'est donné), en deux requêtes.
+        """
+        if diagnostic_ids is None and molecule_ids is None:
+            condition, params = 'TRUE', {}
+        else:
+            diagnostic_ids, molecule_ids = list(diagnostic_ids or []), list(molecule_ids or [])
+            if not diagnostic_ids and not molecule_ids:
+                return
+            condition = '{diagnostic} = ANY(%(diagnostic_ids)s) OR {molecule} = ANY(%(molecule_ids)s)'
+            params = {'diagnostic_ids': diagnostic_ids, 'molecule_ids': molecule_ids}
+
+        Diagnostic = self.env['dynamed.diagnostic']
+        Molecule = self.env['dynamed.molecule']
+        Diagnostic.flush_model(['classe_medicale_ids'])
+        Molecule.flush_model(['classes_medicales_ids'])
+        self.env['dynamed.classe.medicale'].flush_model(['molecules_ids'])
+        diagnostic_classes = Diagnostic._fields['classe_medicale_ids']
+        molecule_classes = Molecule._fields['classes_medicales_ids']
+
+        cr = self.env.cr
+        cr.execute(
+            f"DELETE FROM {self._table} WHERE "
+            + condition.format(diagnostic='diagnostic_id', molecule='molecule_id'),
+            params,
+        )
+        cr.execute(f"""
+            INSERT INTO {self._table} (diagnostic_id, molecule_id)
+                 SELECT DISTINCT diagnostic.{diagnostic_classes.column1}, molecule.{molecule_classes.column1}
+                   FROM {diagnostic_classes.relation} diagnostic
+                   JOIN {molecule_classes.relation} molecule
+                     ON molecule.{molecule_classes.column2} = diagnostic.{diagnostic_classes.column2}
+                  WHERE {condition.format(
+                      diagnostic=f'diagnostic.{diagnostic_classes.column1}',
+                      molecule=f'molecule.{molecule_classes.column1}',
+                  )}
+            ON CONFLICT DO NOTHING
+        """, params)
+        self.invalidate_model()
+        Diagnostic.invalidate_model(['candidate_ids', 'candidate_molecule_ids', 'candidate_count'])
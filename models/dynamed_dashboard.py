@@ -1,103 +1,136 @@
-from odoo import models, fields, api
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
 
+from odoo import models, fields, api
+from odoo.tools.lru import LRU
+
+from ..tools import perf
+from .perf_sample import instrument
+
+# Durée de vie (en secondes) des données du tableau de bord mises en cache
+DASHBOARD_CACHE_TTL = 60
+# Nombre maximal d'utilisateurs en cache par processus (les moins récents sont évincés)
+DASHBOARD_CACHE_SIZE = 256
+
+# {(base, utilisateur): (expiration, données)}, propre à chaque processus
+_dashboard_cache = LRU(DASHBOARD_CACHE_SIZE)
+
 
 class DynamedDashboard(models.Model):
     _name = 'dynamed.dashboard'
     _description = 'Tableau de bord Dynamed'
 
+    @instrument()
     def get_doctor_count(self):
         # Nombre de médecins avec user actif
         return self.env['dynamed.medecin'].search_count([('user_id.active', '=', True)])
 
+    @instrument()
     def get_clinic_count(self):
         # Nombre total de cliniques
         return self.env['dynamed.clinique'].search_count([])
 
+    @instrument()
     def get_patient_count(self):
         # Nombre total de patients
         return self.env['dynamed.patient'].search_count([])
 
+    def _get_period_starts(self):
+        # Début de chaque période, et du mois le plus ancien des 12 derniers mois
+        today = datetime.now().date()
+        first_month = today.replace(day=1)
+        for i in range(11):
+            first_month = (first_month - timedelta(days=1)).replace(day=1)
+        return {
+            'today': today,
+            'week': today - timedelta(days=today.weekday()),
+            'month': today.replace(day=1),
+            'year': today.replace(month=1, day=1),
+            'first_month': first_month,
+        }
+
+    def _get_consultation_counts(self):
+        """
+        Nombre de consultations par jour depuis le début des 12 derniers mois, lu en une seule
+        requête groupée dans les statistiques journalières : les totaux du jour, de la semaine,
+        du mois, de l'année et de chaque mois en sont déduits (toutes ces périodes sont incluses
+        dans la fenêtre).
+        """
+        starts = self._get_period_starts()
+        groups = self.env['dynamed.consultation.stat'].get_counts(starts['first_month'])
+        by_day = {day: count for day, count in groups}
+
+        def count_since(start):
+            return sum(count for day, count in by_day.items() if start <= day <= starts['today'])
+
+        by_month = defaultdict(int)
+        for day, count in by_day.items():
+            by_month[day.replace(day=1)] += count
+
+        last_12_months = []
+        month_start = starts['first_month']
+        for i in range(12):
+            last_12_months.append({
+                'month': month_start.strftime('%b %Y'),
+                'count': by_month[month_start],
+            })
+            month_start = (month_start + timedelta(days=32)).replace(day=1)
+
+        return {
+            'today_consultations': count_since(starts['today']),
+            'week_consultations': count_since(starts['week']),
+            'month_consultations': count_since(starts['month']),
+            'year_consultations': count_since(starts['year']),
+            'last_12_months': last_12_months,
+        }
+
+    @instrument()
     def get_today_consultations(self):
         # Consultations aujourd'hui
-        today = datetime.now().date()
-        return self.env['dynamed.consultation'].search_count([
-            ('create_date', '>=', today.strftime('%Y-%m-%d 00:00:00')),
-            ('create_date', '<=', today.strftime('%Y-%m-%d 23:59:59'))
-        ])
+        return self._get_consultation_counts()['today_consultations']
 
+    @instrument()
     def get_week_consultations(self):
         # Consultations cette semaine
-        today = datetime.now().date()
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-        return self.env['dynamed.consultation'].search_count([
-            ('create_date', '>=', week_start.strftime('%Y-%m-%d 00:00:00')),
-            ('create_date', '<=', week_end.strftime('%Y-%m-%d 23:59:59'))
-        ])
+        return self._get_consultation_counts()['week_consultations']
 
+    @instrument()
     def get_month_consultations(self):
         # Consultations ce mois
-        today = datetime.now().date()
-        month_start = today.replace(day=1)
-        next_month = month_start.replace(
-            month=month_start.month + 1) if month_start.month < 12 else month_start.replace(year=month_start.year + 1,
-                                                                                            month=1)
-        month_end = next_month - timedelta(days=1)
-        return self.env['dynamed.consultation'].search_count([
-            ('create_date', '>=', month_start.strftime('%Y-%m-%d 00:00:00')),
-            ('create_date', '<=', month_end.strftime('%Y-%m-%d 23:59:59'))
-        ])
+        return self._get_consultation_counts()['month_consultations']
 
+    @instrument()
     def get_year_consultations(self):
         # Consultations cette année
-        today = datetime.now().date()
-        year_start = today.replace(month=1, day=1)
-        year_end = today.replace(month=12, day=31)
-        return self.env['dynamed.consultation'].search_count([
-            ('create_date', '>=', year_start.strftime('%Y-%m-%d 00:00:00')),
-            ('create_date', '<=', year_end.strftime('%Y-%m-%d 23:59:59'))
-        ])
+        return self._get_consultation_counts()['year_consultations']
 
+    @instrument()
     def get_last_12_months_consultations(self):
         # Statistiques des 12 derniers mois
-        result = []
-        today = datetime.now().date()
-
-        for i in range(11, -1, -1):
-            month = today.month - i
-            year = today.year
-            if month <= 0:
-                month += 12
-                year -= 1
-
-            month_start = datetime(year, month, 1)
-            next_month = month_start.replace(
-                month=month_start.month + 1) if month_start.month < 12 else month_start.replace(
-                year=month_start.year + 1, month=1)
-            month_end = next_month - timedelta(days=1)
-
-            count = self.env['dynamed.consultation'].search_count([
-                ('create_date', '>=', month_start.strftime('%Y-%m-%d 00:00:00')),
-                ('create_date', '<=', month_end.strftime('%Y-%m-%d 23:59:59'))
-            ])
-
-            result.append({
-                'month': month_start.strftime('%b %Y'),
-                'count': count
-            })
-
-        return result
+        return self._get_consultation_counts()['last_12_months']
 
     @api.model
+    @instrument()
     def get_dashboard_data(self):
-        return {
+        # Mis en cache par utilisateur (les règles d'accès s'appliquent aux comptages)
+        key = (self.env.cr.dbname, self.env.uid)
+        cached = _dashboard_cache.get(key)
+        if cached:
+            if cached[0] > time.monotonic():
+                perf.mark_cache_hit()
+                return cached[1]
+            try:
+                _dashboard_cache.pop(key)
+            except KeyError:
+                # Déjà retirée par un autre thread
+                pass
+
+        data = {
             'doctor_count': self.get_doctor_count(),
             'clinic_count': self.get_clinic_count(),
             'patient_count': self.get_patient_count(),
-            'today_consultations': self.get_today_consultations(),
-            'week_consultations': self.get_week_consultations(),
-            'month_consultations': self.get_month_consultations(),
-            'year_consultations': self.get_year_consultations(),
-            'last_12_months': self.get_last_12_months_consultations(),
-        }
\ No newline at end of file
+            **self._get_consultation_counts(),
+        }
+        _dashboard_cache[key] = (time.monotonic() + DASHBOARD_CACHE_TTL, data)
+        return data
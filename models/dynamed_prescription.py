@@ -1,9 +1,14 @@
+from collections import Counter
+
 from odoo import models, fields, api
 from odoo.exceptions import UserError, ValidationError
 
+from .perf_sample import instrument
+
 
 class DynamedPrescription(models.Model):
     _name = 'dynamed.prescription'
+    _inherit = ['dynamed.sync.mixin']
     _description = 'Prescription Médicale'
 
     # Champs de base
@@ -26,6 +31,13 @@ class DynamedPrescription(models.Model):
         store=True,
         readonly=True,
     )
+    owner_user_id = fields.Many2one(
+        'res.users',
+        string='Propriétaire',
+        related='consultation_id.owner_user_id',
+        store=True,
+        index=True,
+    )
     patient_id = fields.Many2one(  # Ensure this field is defined
         'dynamed.patient',
         string="Patient",
@@ -53,11 +65,55 @@ class DynamedPrescription(models.Model):
     )
 
     # Méthode pour générer une référence unique
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', 'Nouvelle Ordonnance') == 'Nouvelle Ordonnance':
+                vals['name'] = self.env['ir.sequence'].next_by_code('dynamed.prescription') or 'Nouvelle Ordonnance'
+        prescriptions = super().create(vals_list)
+        self.env['dynamed.medecin']._update_activity(
+            'nombre_ordonnances', Counter(prescription.medecin_id.id for prescription in prescriptions)
+        )
+        return prescriptions
+
+    def unlink(self):
+        self.env['dynamed.medecin']._update_activity('nombre_ordonnances', {
+            medecin_id: -count for medecin_id, count in Counter(record.medecin_id.id for record in self).items()
+        })
+        return super().unlink()
+
     @api.model
-    def create(self, vals):
-        if vals.get('name', 'Nouvelle Ordonnance') == 'Nouvelle Ordonnance':
-            vals['name'] = self.env['ir.sequence'].next_by_code('dynamed.prescription') or 'Nouvelle Ordonnance'
-        return super().create(vals)
+    def get_interaction_matrix(self, molecule_ids):
+        """
+        Retourne toutes les interactions deux à deux entre les molécules candidates d'une
+        ordonnance, en un seul appel :
+
+        - ``molecule_ids`` : les molécules, dans l'ordre reçu (sans doublon)
+        - ``matrix`` : matrice N×N, ``False`` ou ``{'interaction_id', 'type_interaction',
+          'classe_medicale_id'}`` (symétrique)
+        - ``interactions`` : la liste des paires en interaction
+        """
+        molecule_ids = list(dict.fromkeys(int(molecule_id) for molecule_id in molecule_ids))
+        interaction_map = self.env['dynamed.interaction']._get_interaction_map(molecule_ids)
+
+        matrix = [[False] * len(molecule_ids) for molecule_id in molecule_ids]
+        interactions = []
+        position = {molecule_id: i for i, molecule_id in enumerate(molecule_ids)}
+        for (min_id, max_id), interaction in interaction_map.items():
+            cell = {
+                'interaction_id': interaction['id'],
+                'type_interaction': interaction['type_interaction'],
+                'classe_medicale_id': interaction['classe_medicale_id'],
+            }
+            i, j = position[min_id], position[max_id]
+            matrix[i][j] = matrix[j][i] = cell
+            interactions.append(dict(cell, molecule_1_id=min_id, molecule_2_id=max_id))
+
+        return {
+            'molecule_ids': molecule_ids,
+            'matrix': matrix,
+            'interactions': interactions,
+        }
 
     # Méthode pour imprimer le rapport
     def action_print_prescription(self):
@@ -93,61 +149,76 @@ class PrescriptionMoleculeLine(models.Model):
                 record.forme = False
                 record.conditionnement = False
 
-    @api.model
-    def create(self, vals):
-        # Vérification avant création
-        prescription = self.env['dynamed.prescription'].browse(vals.get('prescription_id'))
-        new_molecule = self.env['dynamed.molecule'].browse(vals.get('molecule_id'))
-
-        if prescription and new_molecule:
-            # Récupérer les molécules existantes
-            existing_molecules = prescription.molecule_line_ids.mapped('molecule_id')
-
-            # Vérifier les interactions
-            interactions = self._check_interactions(new_molecule, existing_molecules)
+    @api.model_create_multi
+    @instrument()
+    def create(self, vals_list):
+        # Vérification avant création : une seule requête d'interactions pour tout le lot,
+        # chaque nouvelle molécule étant comparée aux lignes existantes et aux précédentes du lot
+        Molecule = self.env['dynamed.molecule']
+        prescriptions = self.env['dynamed.prescription'].browse(
+            {vals['prescription_id'] for vals in vals_list if vals.get('prescription_id')}
+        )
+        planned = {
+            prescription.id: prescription.molecule_line_ids.mapped('molecule_id')
+            for prescription in prescriptions
+        }
+        molecule_ids = set(prescriptions.molecule_line_ids.molecule_id.ids)
+        molecule_ids.update(vals['molecule_id'] for vals in vals_list if vals.get('molecule_id'))
+        interaction_map = self.env['dynamed.interaction']._get_interaction_map(molecule_ids)
+
+        for vals in vals_list:
+            if not (vals.get('prescription_id') and vals.get('molecule_id')):
+                continue
+            new_molecule = Molecule.browse(vals['molecule_id'])
+            existing_molecules = planned[vals['prescription_id']]
+            interactions = self._find_interactions(new_molecule, existing_molecules, interaction_map)
             if interactions:
                 raise UserError(
                     "⚠️❌ Interaction médicamenteuse détectée :\n\n" +
                     "\n".join([
-                        f"- {new_molecule.name} + {mol.name}: {interaction.type_interaction}"
-                        for mol, interaction in interactions.items()
+                        f"- {new_molecule.name} + {mol.name}: {type_interaction}"
+                        for mol, type_interaction in interactions.items()
                     ]) +
                     "\n\n Veuillez choisir une autre molécule."
                 )
+            planned[vals['prescription_id']] |= new_molecule
 
-        return super().create(vals)
-
-    def _check_interactions(self, new_molecule, existing_molecules):
-        """Retourne un dictionnaire des interactions trouvées"""
-        interactions = {}
-
-        for molecule in existing_molecules:
-            # Recherche d'interaction dans les deux sens
-            interaction = self.env['dynamed.interaction'].search([
-                '|',
-                '&', ('medicament_1_id', '=', new_molecule.id),
-                ('medicament_2_id', '=', molecule.id),
-                '&', ('medicament_2_id', '=', new_molecule.id),
-                ('medicament_1_id', '=', molecule.id)
-            ], limit=1)
+        return super().create(vals_list)
 
+    @api.model
+    def _find_interactions(self, molecule, others, interaction_map):
+        """Retourne {molécule de ``others``: type d'interaction} d'après une carte
+        calculée par ``dynamed.interaction._get_interaction_map``"""
+        result = {}
+        for other in others:
+            interaction = interaction_map.get((min(molecule.id, other.id), max(molecule.id, other.id)))
             if interaction:
-                interactions[molecule] = interaction
+                result.setdefault(other, interaction['type_interaction'])
+        return result
 
-        return interactions
+    def write(self, vals):
+        res = super().write(vals)
+        # À la création, les interactions sont déjà vérifiées par create avant l'insertion
+        if 'molecule_id' in vals:
+            self._check_interactions_on_update()
+        return res
 
-    @api.constrains('molecule_id')
+    @instrument()
     def _check_interactions_on_update(self):
-        for rec in self:
-            prescription = rec.prescription_id
-            if prescription:
-                other_molecules = prescription.molecule_line_ids - rec
-                interactions = self._check_interactions(rec.molecule_id, other_molecules)
-                if interactions:
-                    raise ValidationError(
-                        "Interaction médicamenteuse détectée après modification:\n\n" +
-                        "\n".join([
-                            f"- {rec.molecule_id.name} + {mol.name}: {interaction.type_interaction}"
-                            for mol, interaction in interactions.items()
-                        ])
-                    )
\ No newline at end of file
+        lines = self.filtered('prescription_id')
+        interaction_map = self.env['dynamed.interaction']._get_interaction_map(
+            lines.prescription_id.molecule_line_ids.molecule_id.ids
+        )
+        if not interaction_map:
+            return
+        for rec in lines:
+            other_molecules = (rec.prescription_id.molecule_line_ids - rec).mapped('molecule_id')
+            interactions = self._find_interactions(rec.molecule_id, other_molecules, interaction_map)
+            if interactions:
+                raise ValidationError(
+                    "Interaction médicamenteuse détectée après modification:\n\n" +
+                    "\n".join([
+                        f"- {rec.molecule_id.name} + {mol.name}: {type_interaction}"
+                        for mol, type_interaction in interactions.items()
+                    ])
+                )
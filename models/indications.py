@@ -2,6 +2,7 @@ from odoo import models, fields
 
 class indications(models.Model):
     _name = 'dynamed.indications'
+    _inherit = ['dynamed.knowledge.mixin', 'dynamed.vocabulary.mixin', 'dynamed.sync.mixin']
     _description = 'Indications'
 
     name = fields.Char(string='Nom', required=True)
@@ -1,7 +1,11 @@
-from odoo import models, fields
+from odoo import models, fields, api
+from odoo.tools.sql import create_unique_index, index_exists
+
+from .perf_sample import instrument
 
 class Interaction(models.Model):
     _name = 'dynamed.interaction'
+    _inherit = ['dynamed.sync.mixin']
     _description = 'Interaction entre médicaments'
 
     medicament_1_id = fields.Many2one(
@@ -21,4 +25,72 @@ class Interaction(models.Model):
     type_interaction = fields.Text(
         string="Type d'interaction",
         required=True
-    )
\ No newline at end of file
+    )
+
+    # Paire canonique (plus petit id, plus grand id) : une interaction A/B est la même que B/A
+    molecule_min_id = fields.Many2one(
+        'dynamed.molecule',
+        compute='_compute_canonical_pair',
+        store=True,
+        index=True,
+    )
+    molecule_max_id = fields.Many2one(
+        'dynamed.molecule',
+        compute='_compute_canonical_pair',
+        store=True,
+        index=True,
+    )
+
+    @api.depends('medicament_1_id', 'medicament_2_id')
+    def _compute_canonical_pair(self):
+        for interaction in self:
+            pair = [interaction.medicament_1_id, interaction.medicament_2_id]
+            if all(molecule.id for molecule in pair):
+                pair.sort(key=lambda molecule: molecule.id)
+            interaction.molecule_min_id, interaction.molecule_max_id = pair
+
+    def init(self):
+        super().init()
+        cr = self.env.cr
+        if index_exists(cr, 'dynamed_interaction_canonical_pair_uniq'):
+            return
+        # Renseigner la paire canonique des lignes existantes, puis supprimer les doublons
+        # (A, B) / (B, A) d'une même classe en gardant la plus ancienne interaction
+        cr.execute("""
+            UPDATE dynamed_interaction
+               SET molecule_min_id = LEAST(medicament_1_id, medicament_2_id),
+                   molecule_max_id = GREATEST(medicament_1_id, medicament_2_id)
+             WHERE molecule_min_id IS NULL OR molecule_max_id IS NULL
+        """)
+        cr.execute("""
+            DELETE FROM dynamed_interaction duplicate
+             USING dynamed_interaction kept
+             WHERE duplicate.molecule_min_id = kept.molecule_min_id
+               AND duplicate.molecule_max_id = kept.molecule_max_id
+               AND COALESCE(duplicate.classe_medicale_id, 0) = COALESCE(kept.classe_medicale_id, 0)
+               AND duplicate.id > kept.id
+        """)
+        create_unique_index(
+            cr, 'dynamed_interaction_canonical_pair_uniq', self._table,
+            ['molecule_min_id', 'molecule_max_id', 'COALESCE(classe_medicale_id, 0)'],
+        )
+
+    @api.model
+    @instrument()
+    def _get_interaction_map(self, molecule_ids):
+        """
+        Retourne {(min_id, max_id): valeurs lues} pour toutes les interactions entre les
+        molécules données, en une seule requête ensembliste sur la paire canonique.
+        """
+        molecule_ids = list(set(molecule_ids))
+        if not molecule_ids:
+            return {}
+        interactions = self.search_read(
+            [('molecule_min_id', 'in', molecule_ids), ('molecule_max_id', 'in', molecule_ids)],
+            ['molecule_min_id', 'molecule_max_id', 'type_interaction', 'classe_medicale_id'],
+            order='id',
+        )
+        result = {}
+        for interaction in interactions:
+            result.setdefault((interaction['molecule_min_id'][0], interaction['molecule_max_id'][0]), interaction)
+        return result
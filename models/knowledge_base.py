@@ -0,0 +1,57 @@
+from odoo import models, api
+
+# Ancien paramètre système de la version (repris à la création de la séquence)
+KNOWLEDGE_BASE_VERSION_PARAM = 'dynamed.knowledge_base_version'
+KNOWLEDGE_BASE_VERSION_SEQUENCE = 'dynamed_knowledge_base_version_seq'
+
+
+class KnowledgeBaseMixin(models.AbstractModel):
+    """Mixin des modèles de la base de connaissances médicamenteuse.
+
+    Toute écriture sur un modèle qui hérite de ce mixin incrémente la version de
+    la base de connaissances, utilisée par les consultations pour savoir si leurs
+    recommandations enregistrées sont encore à jour.
+
+    La version est une séquence PostgreSQL : l'incrément ne verrouille aucune ligne
+    et ne vide pas les caches du registre, contrairement à un paramètre système.
+    """
+    _name = 'dynamed.knowledge.mixin'
+    _description = 'Base de connaissances DynaMed'
+
+    def init(self):
+        super().init()
+        cr = self.env.cr
+        cr.execute("SELECT 1 FROM pg_class WHERE relkind = 'S' AND relname = %s", [KNOWLEDGE_BASE_VERSION_SEQUENCE])
+        if cr.rowcount:
+            return
+        cr.execute("SELECT value FROM ir_config_parameter WHERE key = %s", [KNOWLEDGE_BASE_VERSION_PARAM])
+        row = cr.fetchone()
+        start = int(row[0]) + 1 if row and row[0] else 1
+        cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {KNOWLEDGE_BASE_VERSION_SEQUENCE} START {start}")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self._invalidate_knowledge_base()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self._invalidate_knowledge_base()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._invalidate_knowledge_base()
+        return res
+
+    @api.model
+    def _get_knowledge_base_version(self):
+        self.env.cr.execute(f"SELECT last_value, is_called FROM {KNOWLEDGE_BASE_VERSION_SEQUENCE}")
+        last_value, is_called = self.env.cr.fetchone()
+        return last_value if is_called else last_value - 1
+
+    @api.model
+    def _invalidate_knowledge_base(self):
+        """Incrémente la version de la base de connaissances"""
+        self.env.cr.execute(f"SELECT nextval('{KNOWLEDGE_BASE_VERSION_SEQUENCE}')")
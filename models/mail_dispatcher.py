@@ -0,0 +1,144 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Nombre maximal de tentatives d'envoi d'un email
+MAX_ATTEMPTS = 5
+# Délai avant la première nouvelle tentative, doublé à chaque échec
+RETRY_DELAY = timedelta(minutes=1)
+# Délai au-delà duquel la file d'envoi standard du module mail prend le relais
+FALLBACK_DELAY = timedelta(minutes=15)
+# Nombre d'emails envoyés par lot
+DISPATCH_BATCH_SIZE = 100
+
+
+class MailMail(models.Model):
+    _inherit = 'mail.mail'
+
+    dynamed_dispatch = fields.Boolean(string='Envoi DynaMed', index=True, copy=False)
+    dynamed_attempts = fields.Integer(string="Tentatives d'envoi", copy=False)
+    dynamed_next_attempt = fields.Datetime(string='Prochaine tentative', copy=False)
+
+
+class MailDispatcher(models.AbstractModel):
+    _name = 'dynamed.mail.dispatcher'
+    _description = "Envoi groupé des emails DynaMed"
+
+    @api.model
+    def _queue(self, template, records, email_values=None):
+        """
+        Génère en une passe les emails de ``template`` pour ``records``, les met en file
+        et déclenche l'envoi en arrière-plan. Retourne les ``mail.mail`` créés.
+        """
+        if not records:
+            return self.env['mail.mail']
+        now = fields.Datetime.now()
+        mail_ids = template.send_mail_batch(records.ids, force_send=False, email_values=dict(
+            email_values or {},
+            dynamed_dispatch=True,
+            dynamed_next_attempt=now,
+            # La file standard n'envoie ces emails qu'en secours, si la tâche DynaMed ne l'a pas fait
+            scheduled_date=now + FALLBACK_DELAY,
+        ))
+        self._schedule_dispatch([now])
+        return self.env['mail.mail'].sudo().browse(mail_ids)
+
+    @api.model
+    def _schedule_dispatch(self, at_list=None):
+        self.env.ref('dynamed.ir_cron_dispatch_mails').sudo()._trigger(at_list)
+
+    @api.model
+    def _cron_dispatch(self, batch_size=DISPATCH_BATCH_SIZE):
+        """
+        Envoie les emails en file, par lots, sur une connexion SMTP ouverte une seule fois
+        par serveur pour toute l'exécution. Les échecs sont retentés avec un délai croissant.
+
+        Retourne la liste des lots envoyés : serveur, nombre d'emails, échecs, latence (ms).
+        """
+        Mail = self.env['mail.mail'].sudo()
+        sessions = {}
+        report = []
+        processed_ids = []
+        try:
+            while True:
+                now = fields.Datetime.now()
+                mails = Mail.search([
+                    ('dynamed_dispatch', '=', True),
+                    ('state', 'in', ('outgoing', 'exception')),
+                    ('dynamed_attempts', '<', MAX_ATTEMPTS),
+                    ('dynamed_next_attempt', '<=', now),
+                    ('id', 'not in', processed_ids),
+                ], limit=batch_size, order='dynamed_next_attempt, id')
+                if not mails:
+                    break
+                processed_ids += mails.ids
+                mails.write({'state': 'outgoing'})
+
+                by_server = defaultdict(lambda: Mail)
+                for mail in mails:
+                    by_server[mail.mail_server_id.id] |= mail
+                for server_id, batch in by_server.items():
+                    report.append(self._send_batch(batch, server_id, sessions))
+                self.env.cr.commit()
+        finally:
+            for session in sessions.values():
+                try:
+                    session.quit()
+                except Exception:
+                    pass
+
+        self._schedule_retries()
+        return report
+
+    @api.model
+    def _send_batch(self, mails, server_id, sessions):
+        """Envoie un lot d'emails d'un même serveur et planifie les nouvelles tentatives"""
+        start = time.perf_counter()
+        try:
+            if server_id not in sessions:
+                sessions[server_id] = self.env['ir.mail_server'].connect(mail_server_id=server_id or None)
+            mails._send(auto_commit=False, raise_exception=False, smtp_session=sessions[server_id])
+        except Exception:
+            # Connexion perdue ou impossible : elle sera rouverte au prochain lot
+            _logger.exception("Envoi d'un lot de %s email(s) en échec", len(mails))
+            session = sessions.pop(server_id, None)
+            if session:
+                try:
+                    session.quit()
+                except Exception:
+                    pass
+            mails.filtered(lambda mail: mail.state == 'outgoing').write({'state': 'exception'})
+
+        failed = mails.exists().filtered(lambda mail: mail.state == 'exception')
+        for mail in failed:
+            next_attempt = fields.Datetime.now() + RETRY_DELAY * 2 ** mail.dynamed_attempts
+            mail.write({
+                'dynamed_attempts': mail.dynamed_attempts + 1,
+                'dynamed_next_attempt': next_attempt,
+                'scheduled_date': next_attempt + FALLBACK_DELAY,
+            })
+
+        latency = (time.perf_counter() - start) * 1000
+        _logger.info("Lot de %s email(s) envoyé en %.0f ms (%s échec(s))", len(mails), latency, len(failed))
+        return {
+            'mail_server_id': server_id,
+            'count': len(mails),
+            'failed': len(failed),
+            'latency_ms': latency,
+        }
+
+    @api.model
+    def _schedule_retries(self):
+        """Déclenche la tâche à la prochaine tentative prévue"""
+        mail = self.env['mail.mail'].sudo().search([
+            ('dynamed_dispatch', '=', True),
+            ('state', 'in', ('outgoing', 'exception')),
+            ('dynamed_attempts', '<', MAX_ATTEMPTS),
+        ], order='dynamed_next_attempt', limit=1)
+        if mail.dynamed_next_attempt:
+            self._schedule_dispatch([max(mail.dynamed_next_attempt, fields.Datetime.now())])
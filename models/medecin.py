@@ -1,27 +1,97 @@
 from odoo import models, fields, api
 
+# Tris autorisés pour la liste d'activité des médecins
+ACTIVITY_ORDERS = [
+    f'{field_name} {direction}'
+    for field_name in ('nombre_ordonnances', 'nombre_consultations', 'date_derniere_activite')
+    for direction in ('asc', 'desc')
+]
+
 class Medecin(models.Model):
     _name = 'dynamed.medecin'
     _description = 'Médecin'
     _inherits = {'res.users': 'user_id'}  # Inherit from res.users
+    _inherit = ['dynamed.payment.proof.mixin']
 
     user_id = fields.Many2one('res.users', string='Utilisateur associé', required=True, ondelete='cascade')
     type_pratique = fields.Selection([('prive', 'Privé'), ('public', 'Public')], string='Type de pratique')
     specialite_id = fields.Many2one('dynamed.specialite', string='Spécialité')
-    preuve_paiement = fields.Binary(string='Preuve de paiement')
     consultation_ids = fields.One2many('dynamed.consultation', 'medecin_id', string='Consultations')
-    nombre_ordonnances = fields.Integer(
-        string='Nombre d\'ordonnances',
-        compute='_compute_nombre_ordonnances',
-        store=True,  # Optionnel : stocke la valeur en base pour des requêtes plus rapides
-    )
-
-    @api.depends('user_id')
-    def _compute_nombre_ordonnances(self):
-        for medecin in self:
-            medecin.nombre_ordonnances = self.env['dynamed.prescription'].search_count([
-                ('medecin_id', '=', medecin.id)
-            ])
+    # Compteurs d'activité, tenus à jour par les consultations et les ordonnances
+    # (_update_activity) et recalculables en lot (_recompute_activity, repris une fois
+    # pour les bases existantes par la migration 1.1)
+    nombre_ordonnances = fields.Integer(string='Nombre d\'ordonnances', readonly=True, index=True)
+    nombre_consultations = fields.Integer(string='Nombre de consultations', readonly=True, index=True)
+    date_derniere_activite = fields.Datetime(string='Dernière activité', readonly=True, index=True)
+
+    def _update_activity(self, field_name, deltas):
+        """
+        Ajoute ``deltas`` ({id du médecin: variation}) au compteur ``field_name`` en une requête,
+        et met à jour la date de dernière activité des médecins dont le compteur augmente.
+        """
+        deltas = {medecin_id: delta for medecin_id, delta in deltas.items() if medecin_id and delta}
+        if not deltas:
+            return
+        self.flush_model([field_name, 'date_derniere_activite'])
+        self.env.cr.execute(f"""
+            UPDATE {self._table} medecin
+               SET {field_name} = COALESCE(medecin.{field_name}, 0) + delta.value,
+                   date_derniere_activite = CASE WHEN delta.value > 0
+                                                 THEN now() at time zone 'UTC'
+                                                 ELSE medecin.date_derniere_activite END
+              FROM unnest(%s::int[], %s::int[]) AS delta(id, value)
+             WHERE medecin.id = delta.id
+        """, [list(deltas), list(deltas.values())])
+        self.invalidate_model([field_name, 'date_derniere_activite'])
+
+    def _recompute_activity(self):
+        """Recalcule les compteurs d'activité des médecins en deux requêtes groupées"""
+        if not self:
+            return
+        stats = {medecin_id: [0, 0, False] for medecin_id in self.ids}
+        for position, model_name in enumerate(('dynamed.prescription', 'dynamed.consultation')):
+            groups = self.env[model_name].sudo()._read_group(
+                [('medecin_id', 'in', self.ids)],
+                groupby=['medecin_id'],
+                aggregates=['__count', 'create_date:max'],
+            )
+            for medecin, count, last_date in groups:
+                stats[medecin.id][position] = count
+                stats[medecin.id][2] = max(filter(None, [stats[medecin.id][2], last_date]), default=False)
+
+        self.flush_model(['nombre_ordonnances', 'nombre_consultations', 'date_derniere_activite'])
+        self.env.cr.execute(f"""
+            UPDATE {self._table} medecin
+               SET nombre_ordonnances = stat.ordonnances,
+                   nombre_consultations = stat.consultations,
+                   date_derniere_activite = stat.derniere_activite
+              FROM unnest(%s::int[], %s::int[], %s::int[], %s::timestamp[])
+                AS stat(id, ordonnances, consultations, derniere_activite)
+             WHERE medecin.id = stat.id
+        """, [
+            list(stats),
+            [values[0] for values in stats.values()],
+            [values[1] for values in stats.values()],
+            [values[2] or None for values in stats.values()],
+        ])
+        self.invalidate_model(['nombre_ordonnances', 'nombre_consultations', 'date_derniere_activite'])
+
+    @api.model
+    def get_activity(self, order='date_derniere_activite desc', limit=80, offset=0):
+        """Liste des médecins avec leurs compteurs, triée et paginée en base"""
+        if order not in ACTIVITY_ORDERS:
+            order = 'date_derniere_activite desc'
+        return {
+            'count': self.search_count([]),
+            'records': self.search_read(
+                [],
+                ['name', 'email', 'specialite_id', 'en_essai', 'est_suspendu',
+                 'nombre_ordonnances', 'nombre_consultations', 'date_derniere_activite'],
+                order=f'{order} NULLS LAST, id',
+                limit=limit,
+                offset=offset,
+            ),
+        }
 
     en_essai = fields.Boolean(string='En période d\'essai', default=False)
     date_fin_essai = fields.Datetime(string='Fin de la période d\'essai')
@@ -41,4 +111,4 @@ class Medecin(models.Model):
 class ResUsers(models.Model):
     _inherit = 'res.users'
 
-    medecin_id = fields.One2many('dynamed.medecin', 'user_id', string='Médecin Profile')
\ No newline at end of file
+    medecin_id = fields.One2many('dynamed.medecin', 'user_id', string='Médecin Profile')
@@ -2,6 +2,7 @@ from odoo import models, fields
 
 class MedicamentActuels(models.Model):
     _name = 'dynamed.medicaments_actuels'
+    _inherit = ['dynamed.knowledge.mixin', 'dynamed.vocabulary.mixin', 'dynamed.sync.mixin']
     _description = 'Médicaments actuellement pris par le patient'
 
     name = fields.Char(string="Nom du médicament", required=True)
@@ -1,8 +1,9 @@
-from odoo import models, fields
+from odoo import models, fields, api
 
 
 class Molecule(models.Model):
     _name = 'dynamed.molecule'
+    _inherit = ['dynamed.knowledge.mixin', 'dynamed.search.key.mixin', 'dynamed.sync.mixin']
     _description = 'Molécule médicamenteuse'
 
     name = fields.Char(string="Nom de la molécule", required=True)
@@ -22,4 +23,82 @@ class Molecule(models.Model):
         'dynamed.precaution',
         string='Précautions',
         help='Liste des précautions associées à cette molécule'
-    )
\ No newline at end of file
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        molecules = super().create(vals_list)
+        if any(vals.get('classes_medicales_ids') for vals in vals_list):
+            self.env['dynamed.diagnostic.candidate']._rebuild(molecule_ids=molecules.ids)
+        return molecules
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'classes_medicales_ids' in vals:
+            self.env['dynamed.diagnostic.candidate']._rebuild(molecule_ids=self.ids)
+        return res
+
+    @api.model
+    def _get_scores(self, diagnostic_ids, contraindications, indication_ids, precaution_ids,
+                    pregnant=False, breastfeeding=False):
+        """
+        Score des molécules calculé entièrement en base, utilisé par
+        ``dynamed.consultation.score_molecules``.
+
+        Les candidates sont celles des diagnostics ``diagnostic_ids`` (lues dans
+        ``dynamed.diagnostic.candidate``), moins celles contre-indiquées (anti-jointures sur les
+        tables de relation de ``contraindications``, {champ Many2many de la molécule: ids}, et
+        drapeaux grossesse/allaitement). Le score vaut 2 par indication de ``indication_ids``
+        moins 1 par précaution de ``precaution_ids``.
+
+        Retourne [(molecule_id, score)] des scores positifs, du meilleur au moins bon.
+        """
+        if not diagnostic_ids:
+            return []
+        self.flush_model()
+
+        def relation(field_name):
+            field = self._fields[field_name]
+            return field.relation, field.column1, field.column2
+
+        params = {
+            'diagnostic_ids': list(diagnostic_ids),
+            'indication_ids': list(indication_ids),
+            'precaution_ids': list(precaution_ids),
+        }
+        conditions = []
+        for i, (field_name, ids) in enumerate(contraindications.items()):
+            if not ids:
+                continue
+            table, molecule_column, term_column = relation(field_name)
+            params[f'excluded_{i}'] = list(ids)
+            conditions.append(f"""
+                AND NOT EXISTS (SELECT 1 FROM {table} rel
+                                 WHERE rel.{molecule_column} = molecule.id
+                                   AND rel.{term_column} = ANY(%(excluded_{i})s))""")
+        if pregnant:
+            conditions.append("AND molecule.grossesse IS NOT TRUE")
+        if breastfeeding:
+            conditions.append("AND molecule.allaitement IS NOT TRUE")
+
+        indication_table, indication_molecule, indication_term = relation('indications_ids')
+        precaution_table, precaution_molecule, precaution_term = relation('precaution_ids')
+        self.env.cr.execute(f"""
+            SELECT id, score FROM (
+                SELECT molecule.id,
+                       2 * (SELECT count(*) FROM {indication_table} rel
+                             WHERE rel.{indication_molecule} = molecule.id
+                               AND rel.{indication_term} = ANY(%(indication_ids)s))
+                         - (SELECT count(*) FROM {precaution_table} rel
+                             WHERE rel.{precaution_molecule} = molecule.id
+                               AND rel.{precaution_term} = ANY(%(precaution_ids)s)) AS score
+                  FROM {self._table} molecule
+                 WHERE molecule.id IN (SELECT candidate.molecule_id
+                                         FROM dynamed_diagnostic_candidate candidate
+                                        WHERE candidate.diagnostic_id = ANY(%(diagnostic_ids)s))
+                 {''.join(conditions)}
+            ) scored
+             WHERE score > 0
+          ORDER BY score DESC, id
+        """, params)
+        return self.env.cr.fetchall()
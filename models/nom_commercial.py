@@ -1,8 +1,10 @@
 from odoo import models, fields, api
+from odoo.tools.sql import create_index
 
 
 class NomCommercial(models.Model):
     _name = 'nom.commercial'
+    _inherit = ['dynamed.search.key.mixin', 'dynamed.sync.mixin']
     _description = 'Noms Commerciaux des Médicaments'
 
     name = fields.Char(string='Nom Commercial', required=True)
@@ -11,3 +13,11 @@ class NomCommercial(models.Model):
     conditionnement = fields.Char(string='Conditionnement')
     molecule_id = fields.Many2one('dynamed.molecule', string='Molecule', required=True)
 
+    def init(self):
+        super().init()
+        # Recherche des noms existants par (molécule, nom) lors des imports, et noms d'une molécule
+        create_index(self.env.cr, 'nom_commercial_molecule_name_idx', self._table, ['molecule_id', 'name'])
+
+    @api.model
+    def _autocomplete_fields(self):
+        return ['name', 'dosage', 'forme_pharmaceutique', 'molecule_id']
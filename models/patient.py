@@ -2,6 +2,7 @@ from odoo import models, fields,api
 
 class Patient(models.Model):
     _name = 'dynamed.patient'
+    _inherit = ['dynamed.sync.mixin']
     _description = 'Patient'
 
 
@@ -10,6 +11,15 @@ class Patient(models.Model):
     phone = fields.Char(string='Téléphone')
     email = fields.Char(string='Email')
     sexe = fields.Selection([('homme', 'Homme'), ('femme', 'Femme')], string='Sexe')
+    # Utilisateur qui a créé le patient, indexé pour la règle d'accès des médecins
+    # (les patients existants sont repris de create_uid à l'installation de la colonne)
+    owner_user_id = fields.Many2one(
+        'res.users',
+        string='Propriétaire',
+        compute='_compute_owner_user_id',
+        store=True,
+        index=True,
+    )
 
     #just for dashboard
     age_group = fields.Selection(
@@ -25,6 +35,11 @@ class Patient(models.Model):
         store=True,
     )
 
+    @api.depends('create_uid')
+    def _compute_owner_user_id(self):
+        for patient in self:
+            patient.owner_user_id = patient.create_uid or self.env.user
+
     @api.depends('age')
     def _compute_age_group(self):
         for patient in self:
@@ -0,0 +1,153 @@
+import base64
+import io
+import os
+import tempfile
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+from odoo.tools.mimetypes import guess_mimetype
+
+from ..tools.file_stream import FileTooLarge, copy_limited
+
+# Taille maximale par défaut d'une preuve de paiement (paramètre dynamed.payment_proof_max_size)
+PAYMENT_PROOF_MAX_SIZE = 10 * 1024 * 1024
+
+
+class PaymentProofMixin(models.AbstractModel):
+    """
+    Preuve de paiement enregistrée comme une pièce jointe unique dans le filestore.
+
+    Le fichier téléversé est copié en flux (jamais chargé en mémoire ni encodé en base64),
+    la même pièce jointe est partagée entre la demande d'inscription et le médecin, et les
+    vues n'affichent qu'une miniature générée à la demande par ``/web/image``.
+    """
+    _name = 'dynamed.payment.proof.mixin'
+    _description = 'Preuve de paiement'
+
+    preuve_paiement_attachment_id = fields.Many2one(
+        'ir.attachment',
+        string='Fichier de preuve de paiement',
+        ondelete='set null',
+        copy=False,
+    )
+    preuve_paiement = fields.Binary(
+        string='Preuve de paiement',
+        compute='_compute_preuve_paiement',
+        inverse='_inverse_preuve_paiement',
+    )
+    preuve_paiement_thumbnail = fields.Char(
+        string='Aperçu de la preuve de paiement',
+        compute='_compute_preuve_paiement_thumbnail',
+    )
+
+    def init(self):
+        super().init()
+        if self._abstract:
+            return
+        # Reprise des preuves enregistrées dans l'ancien champ binaire
+        self.env.cr.execute(f"""
+            UPDATE {self._table} record
+               SET preuve_paiement_attachment_id = attachment.id
+              FROM ir_attachment attachment
+             WHERE attachment.res_model = %(model)s
+               AND attachment.res_field = 'preuve_paiement'
+               AND attachment.res_id = record.id
+               AND record.preuve_paiement_attachment_id IS NULL
+        """, {'model': self._name})
+        self.env.cr.execute("""
+            UPDATE ir_attachment
+               SET res_field = NULL
+             WHERE res_model = %s AND res_field = 'preuve_paiement'
+        """, [self._name])
+
+    @api.depends('preuve_paiement_attachment_id')
+    def _compute_preuve_paiement(self):
+        for record in self:
+            record.preuve_paiement = record.preuve_paiement_attachment_id.sudo().datas
+
+    def _inverse_preuve_paiement(self):
+        for record in self:
+            attachment = False
+            if record.preuve_paiement:
+                raw = base64.b64decode(record.preuve_paiement)
+                attachment = record._store_payment_proof(io.BytesIO(raw), 'preuve_paiement', guess_mimetype(raw))
+            record.preuve_paiement_attachment_id = attachment
+
+    @api.depends('preuve_paiement_attachment_id')
+    def _compute_preuve_paiement_thumbnail(self):
+        for record in self:
+            attachment = record.preuve_paiement_attachment_id.sudo()
+            record.preuve_paiement_thumbnail = attachment and (
+                f"/web/image/ir.attachment/{attachment.id}/datas/256x256?unique={attachment.checksum}"
+            )
+
+    def _upload_payment_proof(self, upload):
+        """Enregistre un fichier téléversé (``werkzeug.datastructures.FileStorage``)"""
+        self.ensure_one()
+        self.preuve_paiement_attachment_id = self._store_payment_proof(
+            upload.stream, upload.filename or 'preuve_paiement', upload.mimetype
+        )
+
+    def _store_payment_proof(self, stream, filename, mimetype=None):
+        """
+        Copie ``stream`` dans le filestore bloc par bloc, en vérifiant la taille maximale au fil
+        de la lecture, et retourne la pièce jointe créée. Le fichier est adressé par son contenu :
+        un contenu déjà présent dans le filestore n'est pas réécrit.
+        """
+        self.ensure_one()
+        Attachment = self.env['ir.attachment'].sudo()
+        max_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'dynamed.payment_proof_max_size', PAYMENT_PROOF_MAX_SIZE
+        ))
+        values = {
+            'name': filename,
+            'res_model': self._name,
+            'res_id': self.id,
+        }
+        if mimetype:
+            values['mimetype'] = mimetype
+
+        if Attachment._storage() != 'file':
+            buffer = io.BytesIO()
+            self._copy_payment_proof(stream, buffer, max_size)
+            return Attachment.create(dict(values, raw=buffer.getvalue()))
+
+        filestore = Attachment._filestore()
+        os.makedirs(filestore, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=filestore, prefix='.upload-', delete=False) as target:
+            try:
+                checksum, size = self._copy_payment_proof(stream, target, max_size)
+            except Exception:
+                os.unlink(target.name)
+                raise
+
+        store_fname = f'{checksum[:2]}/{checksum}'
+        full_path = Attachment._full_path(store_fname)
+        if os.path.exists(full_path):
+            os.unlink(target.name)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(target.name, full_path)
+        # Comme _file_write : le fichier est supprimé par le ramasse-miettes du filestore
+        # si la transaction est annulée et qu'aucune pièce jointe ne le référence
+        Attachment._mark_for_gc(store_fname)
+
+        # ir.attachment.create ignore store_fname, checksum et file_size : ils sont écrits
+        # directement sur la pièce jointe créée sans contenu
+        attachment = Attachment.create(dict(values, type='binary'))
+        attachment.flush_recordset()
+        self.env.cr.execute("""
+            UPDATE ir_attachment
+               SET store_fname = %s, checksum = %s, file_size = %s
+             WHERE id = %s
+        """, [store_fname, checksum, size, attachment.id])
+        attachment.invalidate_recordset()
+        return attachment
+
+    def _copy_payment_proof(self, stream, target, max_size):
+        try:
+            return copy_limited(stream, target, max_size)
+        except FileTooLarge:
+            raise ValidationError(
+                "La preuve de paiement dépasse la taille maximale autorisée (%s Mo)." % (max_size // (1024 * 1024))
+            )
@@ -0,0 +1,140 @@
+import functools
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, SUPERUSER_ID
+from odoo.http import request
+from odoo.tools import str2bool
+
+from ..tools import perf
+
+_logger = logging.getLogger(__name__)
+
+# Paramètre système qui active la mesure des performances (désactivée par défaut)
+PERF_ENABLED_PARAM = 'dynamed.perf_enabled'
+# Mesures conservées en mémoire par processus et par base avant d'être perdues
+PERF_BUFFER_SIZE = 10000
+# Les mesures sont enregistrées par lots de cette taille, ou au plus tard après ce délai (s)
+PERF_FLUSH_SIZE = 100
+PERF_FLUSH_INTERVAL = 30
+# Durée de conservation des mesures enregistrées
+PERF_RETENTION = timedelta(days=7)
+# Période couverte par l'export Prometheus
+PERF_METRICS_WINDOW = timedelta(minutes=5)
+
+# Tampons des mesures non enregistrées, par base
+_buffers = {}
+
+
+def instrument(name=None):
+    """
+    Mesure les appels de la méthode décorée (méthode de modèle ou de contrôleur) : temps,
+    nombre de requêtes SQL, lignes traitées et accès aux caches. Les mesures sont mises en
+    tampon puis enregistrées par lots dans ``dynamed.perf.sample``.
+
+    Mesure désactivée, le coût se limite à la lecture (en cache) du paramètre système.
+    """
+    def decorate(method):
+        metric = name or method.__qualname__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            env = self.env if isinstance(self, models.BaseModel) else request.env
+            if not str2bool(env['ir.config_parameter'].sudo().get_param(PERF_ENABLED_PARAM, 'False'), False):
+                return method(self, *args, **kwargs)
+
+            cr = env.cr
+            queries = cr.sql_log_count
+            measure = perf.measure(metric)
+            try:
+                with measure as sample:
+                    result = method(self, *args, **kwargs)
+                if not sample['row_count'] and isinstance(result, (models.BaseModel, list, tuple)):
+                    sample['row_count'] = len(result)
+                return result
+            finally:
+                sample = measure.sample
+                sample.update(query_count=cr.sql_log_count - queries, user_id=env.uid)
+                buffer = _buffers.setdefault(cr.dbname, perf.SampleBuffer(PERF_BUFFER_SIZE))
+                buffer.append(sample)
+                if measure.outermost and buffer.due(PERF_FLUSH_SIZE, PERF_FLUSH_INTERVAL):
+                    _flush_samples(env.registry, buffer)
+
+        return wrapper
+    return decorate
+
+
+def _flush_samples(registry, buffer):
+    """Enregistre les mesures du tampon dans une transaction distincte de l'appel mesuré"""
+    samples = buffer.drain()
+    try:
+        with registry.cursor() as cr:
+            api.Environment(cr, SUPERUSER_ID, {})['dynamed.perf.sample'].create(samples)
+    except Exception:
+        _logger.exception("Enregistrement de %s mesure(s) de performance en échec", len(samples))
+
+
+class PerfSample(models.Model):
+    _name = 'dynamed.perf.sample'
+    _description = 'Mesure de performance'
+    _order = 'id desc'
+
+    method = fields.Char(string='Méthode', required=True, index=True, readonly=True)
+    duration_ms = fields.Float(string='Durée (ms)', readonly=True, group_operator='avg')
+    query_count = fields.Integer(string='Requêtes SQL', readonly=True, group_operator='avg')
+    row_count = fields.Integer(string='Lignes', readonly=True, group_operator='avg')
+    cache_hit = fields.Boolean(string='Servi par un cache', readonly=True)
+    failed = fields.Boolean(string='En erreur', readonly=True)
+    user_id = fields.Many2one('res.users', string='Utilisateur', readonly=True)
+
+    @api.autovacuum
+    def _gc_samples(self):
+        self.search([('create_date', '<', fields.Datetime.now() - PERF_RETENTION)]).unlink()
+
+    @api.model
+    def action_enable(self):
+        self.env['ir.config_parameter'].sudo().set_param(PERF_ENABLED_PARAM, 'True')
+
+    @api.model
+    def action_disable(self):
+        self.env['ir.config_parameter'].sudo().set_param(PERF_ENABLED_PARAM, False)
+        # Les mesures encore en tampon dans ce processus sont enregistrées tout de suite
+        buffer = _buffers.get(self.env.cr.dbname)
+        if buffer:
+            _flush_samples(self.env.registry, buffer)
+
+    @api.model
+    def get_prometheus_metrics(self, window=PERF_METRICS_WINDOW):
+        """Mesures par méthode sur la période ``window``, au format texte Prometheus"""
+        groups = self._read_group(
+            [('create_date', '>=', fields.Datetime.now() - window)],
+            groupby=['method'],
+            aggregates=['__count', 'duration_ms:sum', 'duration_ms:max', 'query_count:sum', 'row_count:sum'],
+        )
+        cache_hits = dict(self._read_group(
+            [('create_date', '>=', fields.Datetime.now() - window), ('cache_hit', '=', True)],
+            groupby=['method'],
+            aggregates=['__count'],
+        ))
+        failures = dict(self._read_group(
+            [('create_date', '>=', fields.Datetime.now() - window), ('failed', '=', True)],
+            groupby=['method'],
+            aggregates=['__count'],
+        ))
+        window_text = f'sur les {int(window.total_seconds())} dernières secondes'
+        return perf.format_prometheus([
+            ('dynamed_perf_calls', 'gauge', f"Appels mesurés {window_text}",
+             [({'method': method}, count) for method, count, *__ in groups]),
+            ('dynamed_perf_duration_seconds_sum', 'gauge', f"Durée totale des appels {window_text}",
+             [({'method': method}, total / 1000) for method, __, total, *__ in groups]),
+            ('dynamed_perf_duration_seconds_max', 'gauge', f"Durée maximale d'un appel {window_text}",
+             [({'method': method}, maximum / 1000) for method, __, __, maximum, *__ in groups]),
+            ('dynamed_perf_queries_sum', 'gauge', f"Requêtes SQL exécutées {window_text}",
+             [({'method': method}, queries) for method, __, __, __, queries, __ in groups]),
+            ('dynamed_perf_rows_sum', 'gauge', f"Lignes traitées {window_text}",
+             [({'method': method}, rows) for method, __, __, __, __, rows in groups]),
+            ('dynamed_perf_cache_hits', 'gauge', f"Appels servis par un cache {window_text}",
+             [({'method': method}, cache_hits.get(method, 0)) for method, *__ in groups]),
+            ('dynamed_perf_failures', 'gauge', f"Appels en erreur {window_text}",
+             [({'method': method}, failures.get(method, 0)) for method, *__ in groups]),
+        ])
@@ -3,6 +3,7 @@ from odoo import models, fields
 
 class Precaution(models.Model):
     _name = 'dynamed.precaution'
+    _inherit = ['dynamed.knowledge.mixin', 'dynamed.vocabulary.mixin', 'dynamed.sync.mixin']
     _description = 'Précautions médicamenteuses'
 
     name = fields.Char(string='Nom de la précaution', required=True)
\ No newline at end of file
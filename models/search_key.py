@@ -0,0 +1,78 @@
+from odoo import models, fields, api
+
+from ..tools.text_search import escape_like, normalize
+
+# Nombre maximal de résultats de l'autocomplétion
+AUTOCOMPLETE_LIMIT = 20
+
+
+class SearchKeyMixin(models.AbstractModel):
+    """
+    Recherche rapide par nom, insensible aux accents et à la casse.
+
+    ``search_key`` contient le nom normalisé et porte un index trigramme : les recherches
+    ``ilike`` (name_search, autocomplétion) n'ont plus à parcourir toute la table.
+    """
+    _name = 'dynamed.search.key.mixin'
+    _description = 'Clé de recherche normalisée'
+
+    search_key = fields.Char(
+        string='Clé de recherche',
+        compute='_compute_search_key',
+        store=True,
+        index='trigram',
+    )
+
+    @api.depends('name')
+    def _compute_search_key(self):
+        for record in self:
+            record.search_key = normalize(record.name)
+
+    @api.model
+    def _name_search(self, name, domain=None, operator='ilike', limit=None, order=None):
+        if name and operator in ('ilike', 'not ilike', '=ilike'):
+            key = normalize(name)
+            if operator == '=ilike':
+                # Motif fourni par l'appelant : la clé est déjà en minuscules
+                operator = '=like'
+            domain = list(domain or []) + [('search_key', operator, key)]
+            return self._search(domain, limit=limit, order=order)
+        return super()._name_search(name, domain=domain, operator=operator, limit=limit, order=order)
+
+    @api.model
+    def _autocomplete_fields(self):
+        return ['name']
+
+    @api.model
+    def autocomplete(self, query, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Retourne les enregistrements dont le nom contient ``query`` (accents et casse ignorés),
+        les noms commençant par ``query`` en premier, puis par similarité trigramme.
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        self.check_access_rights('read')
+        limit = max(1, min(int(limit or AUTOCOMPLETE_LIMIT), 100))
+        pattern = escape_like(key)
+        if self.env.registry.has_trigram:
+            similarity = 'similarity(search_key, %(key)s)'
+        else:
+            similarity = '0'
+        self.env.cr.execute(f"""
+            SELECT id
+              FROM {self._table}
+             WHERE search_key LIKE %(contains)s
+          ORDER BY search_key LIKE %(prefix)s DESC,
+                   {similarity} DESC,
+                   length(search_key),
+                   id
+             LIMIT %(limit)s
+        """, {
+            'key': key,
+            'contains': f'%{pattern}%',
+            'prefix': f'{pattern}%',
+            'limit': limit,
+        })
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        return self.browse(ids).read(self._autocomplete_fields())
@@ -0,0 +1,148 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools.sql import create_index
+
+# Nombre d'enregistrements par page de synchronisation
+SYNC_PAGE_SIZE = 500
+# Durée de conservation des suppressions : au-delà, le client doit tout resynchroniser
+TOMBSTONE_RETENTION = timedelta(days=90)
+# Les enregistrements modifiés depuis moins longtemps sont renvoyés à la synchronisation suivante
+SYNC_SAFETY_MARGIN = timedelta(minutes=1)
+TOMBSTONE_PURGED_PARAM = 'dynamed.sync_tombstone_purged_id'
+
+
+class SyncTombstone(models.Model):
+    _name = 'dynamed.sync.tombstone'
+    _description = 'Suppression à synchroniser'
+    _order = 'id'
+
+    res_model = fields.Char(string='Modèle', required=True, index=True)
+    res_id = fields.Integer(string='Enregistrement', required=True)
+
+    @api.autovacuum
+    def _gc_tombstones(self):
+        tombstones = self.search([('create_date', '<', fields.Datetime.now() - TOMBSTONE_RETENTION)])
+        if tombstones:
+            # Les jetons antérieurs à la dernière suppression purgée ne sont plus fiables
+            self.env['ir.config_parameter'].sudo().set_param(TOMBSTONE_PURGED_PARAM, max(tombstones.ids))
+            tombstones.unlink()
+
+
+class SyncMixin(models.AbstractModel):
+    """
+    Synchronisation incrémentale des enregistrements avec l'application React.
+
+    Les enregistrements sont parcourus dans l'ordre (``write_date``, ``id``), par pages, à
+    partir d'un curseur opaque. Le dernier curseur d'une synchronisation sert de jeton de
+    delta : la synchronisation suivante ne retourne que les enregistrements modifiés depuis,
+    et les suppressions enregistrées entre-temps (``dynamed.sync.tombstone``).
+    """
+    _name = 'dynamed.sync.mixin'
+    _description = 'Synchronisation incrémentale'
+
+    def init(self):
+        super().init()
+        if self._abstract:
+            return
+        create_index(self.env.cr, f'{self._table}_sync_idx', self._table, ['write_date', 'id'])
+
+    def unlink(self):
+        self._create_tombstones()
+        return super().unlink()
+
+    def _create_tombstones(self):
+        """Enregistre la suppression de ces enregistrements pour les clients synchronisés.
+        À appeler aussi pour les enregistrements supprimés en cascade par la base, qui ne
+        passent pas par ``unlink``."""
+        self.env['dynamed.sync.tombstone'].sudo().create([
+            {'res_model': self._name, 'res_id': record_id} for record_id in self.ids
+        ])
+
+    @api.model
+    def _get_sync_fields(self):
+        """Champs envoyés au client : champs stockés, hors binaires et champs techniques"""
+        return [
+            name for name, field in self._fields.items()
+            if field.store and field.type not in ('binary', 'one2many')
+            and not name.startswith(('message_', 'activity_'))
+            and name not in ('create_uid', 'write_uid', 'create_date')
+        ]
+
+    @api.model
+    def _encode_sync_cursor(self, write_date, record_id, tombstone_id):
+        payload = json.dumps([write_date.isoformat() if write_date else None, record_id, tombstone_id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @api.model
+    def _decode_sync_cursor(self, cursor):
+        """Retourne (write_date, id, id de suppression) du curseur"""
+        if not cursor:
+            return None, 0, 0
+        try:
+            write_date, record_id, tombstone_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(write_date) if write_date else None, int(record_id), int(tombstone_id)
+        except (ValueError, TypeError):
+            raise UserError("Jeton de synchronisation invalide.")
+
+    @api.model
+    def get_sync_page(self, cursor=None, limit=SYNC_PAGE_SIZE):
+        """
+        Retourne une page de synchronisation :
+
+        - ``records`` : enregistrements créés ou modifiés après le curseur
+        - ``deleted`` : ids supprimés après le curseur
+        - ``cursor`` : curseur de la page suivante, ou jeton de delta une fois ``has_more`` faux
+        - ``has_more`` : d'autres pages restent à lire
+        - ``reset`` : le jeton est trop ancien, le client doit tout resynchroniser
+
+        Le curseur ne dépend que des données : tant que rien ne change, la même page est
+        renvoyée, ce qui permet au contrôleur de répondre 304 grâce à l'ETag.
+        """
+        write_date, record_id, tombstone_id = self._decode_sync_cursor(cursor)
+        Tombstone = self.env['dynamed.sync.tombstone'].sudo()
+
+        # Des suppressions postérieures au jeton ont pu être purgées entre-temps
+        purged_id = int(self.env['ir.config_parameter'].sudo().get_param(TOMBSTONE_PURGED_PARAM, 0))
+        reset = bool(write_date) and tombstone_id < purged_id
+        if reset:
+            write_date, record_id, tombstone_id = None, 0, 0
+
+        # Parcours par clé (write_date, id) à la précision de la base, règles d'accès comprises
+        query = self._search([], order='write_date, id', limit=limit)
+        if write_date:
+            query.add_where(f'("{self._table}".write_date, "{self._table}".id) > (%s, %s)', [write_date, record_id])
+        self.env.cr.execute(query.select(f'"{self._table}".id', f'"{self._table}".write_date'))
+        rows = self.env.cr.fetchall()
+        records = self.browse([row[0] for row in rows]).read(self._get_sync_fields())
+
+        if write_date:
+            tombstones = Tombstone.search_read(
+                [('res_model', '=', self._name), ('id', '>', tombstone_id)], ['res_id'], limit=limit,
+            )
+        else:
+            # Synchronisation complète : les suppressions passées n'intéressent pas le client
+            tombstones = []
+            tombstone_id = Tombstone.search([('res_model', '=', self._name)], order='id desc', limit=1).id
+        if tombstones:
+            tombstone_id = tombstones[-1]['id']
+
+        has_more = len(rows) == limit or len(tombstones) == limit
+        if rows:
+            write_date, record_id = rows[-1]
+            # Une transaction plus ancienne peut encore valider des écritures datées d'avant
+            # le jeton : le jeton final n'avance pas au-delà de la marge de sécurité
+            cutoff = fields.Datetime.now() - SYNC_SAFETY_MARGIN
+            if not has_more and write_date > cutoff:
+                write_date, record_id = cutoff, 0
+
+        return {
+            'records': records,
+            'deleted': [tombstone['res_id'] for tombstone in tombstones],
+            'cursor': self._encode_sync_cursor(write_date, record_id, tombstone_id),
+            'has_more': has_more,
+            'reset': reset,
+        }
@@ -0,0 +1,138 @@
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_unique_index, index_exists
+
+from ..tools.text_search import normalize
+
+
+class VocabularyMixin(models.AbstractModel):
+    """
+    Vocabulaire de référence (allergies, indications, classes médicales...) dont chaque
+    terme est unique à la casse et aux accents près.
+
+    ``name_key`` contient le nom normalisé et porte un index unique ; les imports créent
+    les termes par ``_upsert_names`` et le scoring compare des ids plutôt que des noms.
+    """
+    _name = 'dynamed.vocabulary.mixin'
+    _description = 'Vocabulaire de référence'
+
+    name_key = fields.Char(
+        string='Clé du nom',
+        compute='_compute_name_key',
+        store=True,
+        readonly=True,
+    )
+
+    @api.depends('name')
+    def _compute_name_key(self):
+        for record in self:
+            record.name_key = normalize(record.name) or False
+
+    @api.constrains('name_key')
+    def _check_name_key_unique(self):
+        keys = [key for key in self.mapped('name_key') if key]
+        duplicates = self._read_group(
+            [('name_key', 'in', keys)], groupby=['name_key'], aggregates=['__count'], having=[('__count', '>', 1)],
+        )
+        if duplicates:
+            raise ValidationError(
+                "« %s » existe déjà (la casse et les accents ne sont pas pris en compte)."
+                % self.filtered(lambda record: record.name_key == duplicates[0][0])[:1].name
+            )
+
+    def init(self):
+        super().init()
+        if self._abstract:
+            return
+        index_name = f'{self._table}_name_key_uniq'
+        if index_exists(self.env.cr, index_name):
+            return
+        # Première mise à jour : calculer les clés, fusionner les doublons, puis poser l'index
+        records = self.with_context(active_test=False).search([('name_key', '=', False)])
+        records._compute_name_key()
+        self.flush_model(['name_key'])
+        self._merge_duplicate_names()
+        create_unique_index(self.env.cr, index_name, self._table, ['name_key'])
+
+    def _merge_duplicate_names(self):
+        """Fusionne les termes de même clé dans le plus ancien et reporte toutes les références"""
+        cr = self.env.cr
+        cr.execute(f"""
+            SELECT array_agg(id ORDER BY id)
+              FROM {self._table}
+             WHERE name_key IS NOT NULL
+          GROUP BY name_key
+            HAVING count(*) > 1
+        """)
+        mapping = {duplicate_id: ids[0] for ids, in cr.fetchall() for duplicate_id in ids[1:]}
+        if not mapping:
+            return
+        params = [list(mapping), list(mapping.values())]
+
+        done = set()
+        for model in self.env.registry.values():
+            if model._abstract or not model._auto:
+                continue
+            for field in model._fields.values():
+                if not field.store or field.type not in ('many2one', 'many2many'):
+                    continue
+                if field.type == 'many2one' and field.comodel_name == self._name:
+                    targets = [(model._table, field.name, None)]
+                elif field.type == 'many2many':
+                    targets = []
+                    if field.comodel_name == self._name:
+                        targets.append((field.relation, field.column2, field.column1))
+                    if model._name == self._name:
+                        targets.append((field.relation, field.column1, field.column2))
+                else:
+                    continue
+                for table, column, other_column in targets:
+                    if (table, column) in done:
+                        continue
+                    done.add((table, column))
+                    if other_column is None:
+                        cr.execute(f"""
+                            UPDATE {table} SET {column} = merge.new_id
+                              FROM unnest(%s::int[], %s::int[]) AS merge(old_id, new_id)
+                             WHERE {table}.{column} = merge.old_id
+                        """, params)
+                    else:
+                        cr.execute(f"""
+                            INSERT INTO {table} ({column}, {other_column})
+                                 SELECT merge.new_id, rel.{other_column}
+                                   FROM {table} rel
+                                   JOIN unnest(%s::int[], %s::int[]) AS merge(old_id, new_id)
+                                     ON rel.{column} = merge.old_id
+                            ON CONFLICT DO NOTHING
+                        """, params)
+                        cr.execute(f"DELETE FROM {table} WHERE {column} = ANY(%s)", [params[0]])
+
+        cr.execute("""
+            UPDATE ir_model_data SET res_id = merge.new_id
+              FROM unnest(%s::int[], %s::int[]) AS merge(old_id, new_id)
+             WHERE model = %s AND res_id = merge.old_id
+        """, params + [self._name])
+        cr.execute(f"DELETE FROM {self._table} WHERE id = ANY(%s)", [params[0]])
+        self.env.invalidate_all()
+
+    @api.model
+    def _upsert_names(self, names, known=None):
+        """
+        Retourne {nom: id} pour ``names``, en créant en un seul appel les termes dont la clé
+        n'existe pas encore. ``known`` ({clé: id}) peut être fourni et est complété, pour
+        éviter de relire la table entre deux lots d'un même import.
+        """
+        keys = {name: normalize(name) for name in names}
+        if known is None:
+            known = {
+                record['name_key']: record['id']
+                for record in self.search_read([('name_key', 'in', list(set(keys.values()) - {''}))], ['name_key'])
+            }
+        missing = {}
+        for name, key in keys.items():
+            if key and key not in known:
+                missing.setdefault(key, name)
+        if missing:
+            for key, record in zip(missing, self.create([{'name': name} for name in missing.values()])):
+                known[key] = record.id
+        return {name: known[key] for name, key in keys.items() if key in known}
@@ -0,0 +1,2 @@
+from . import test_payment_proof
+from . import test_sync
@@ -0,0 +1,71 @@
+import io
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import TransactionCase
+
+
+class TestPaymentProof(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.inscription = cls.env['dynamed.inscription.medecin'].create({
+            'name': 'Dr Preuve',
+            'email': 'preuve@example.com',
+        })
+
+    def test_store_payment_proof_content(self):
+        content = b'%PDF-1.4 preuve de paiement\n' * 1000
+        attachment = self.inscription._store_payment_proof(io.BytesIO(content), 'preuve.pdf', 'application/pdf')
+
+        attachment.invalidate_recordset()
+        self.assertEqual(attachment.raw, content)
+        self.assertEqual(attachment.file_size, len(content))
+        self.assertTrue(attachment.checksum)
+        self.assertEqual(attachment.res_model, 'dynamed.inscription.medecin')
+        self.assertEqual(attachment.res_id, self.inscription.id)
+
+    def test_payment_proof_shared_with_medecin(self):
+        inscription = self.env['dynamed.inscription.medecin'].create({
+            'name': 'Dr Essai',
+            'email': 'essai.preuve@example.com',
+            'statut': 'essai',
+            'date_fin_essai': fields.Datetime.now() + timedelta(days=7),
+        })
+        inscription.action_create_medecin_trial()
+        medecin = inscription.medecin_id
+        self.assertTrue(medecin)
+
+        inscription.preuve_paiement = 'cHJldXZl'  # b'preuve' en base64
+        attachment = inscription.preuve_paiement_attachment_id
+        self.assertEqual(attachment.raw, b'preuve')
+        Attachment = self.env['ir.attachment'].sudo()
+        attachment_count = Attachment.search_count([])
+
+        inscription.action_confirm_payment()
+
+        # Le médecin référence la même pièce jointe : aucune copie n'est créée
+        self.assertEqual(inscription.statut, 'medecin_cree')
+        self.assertEqual(medecin.preuve_paiement_attachment_id, attachment)
+        self.assertEqual(Attachment.search_count([]), attachment_count)
+        self.assertEqual(medecin.preuve_paiement, inscription.preuve_paiement)
+
+    def test_init_migrates_binary_field_attachment(self):
+        # Preuve enregistrée par l'ancien champ binaire (pièce jointe liée par res_field)
+        attachment = self.env['ir.attachment'].create({
+            'name': 'preuve_paiement',
+            'res_model': 'dynamed.inscription.medecin',
+            'res_field': 'preuve_paiement',
+            'res_id': self.inscription.id,
+            'raw': b'ancienne preuve',
+        })
+        self.env.flush_all()
+
+        # init() du modèle complet : la reprise du mixin doit être atteinte par la chaîne super()
+        self.env['dynamed.inscription.medecin'].init()
+        self.env.invalidate_all()
+
+        self.assertEqual(self.inscription.preuve_paiement_attachment_id, attachment)
+        self.assertFalse(attachment.res_field)
+        self.assertEqual(self.inscription.preuve_paiement_attachment_id.raw, b'ancienne preuve')
@@ -0,0 +1,67 @@
+from odoo.tests import HttpCase, TransactionCase, tagged
+
+
+class TestSync(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.patient = cls.env['dynamed.patient'].create({'name': 'Patient Sync', 'age': 40})
+        cls.consultation = cls.env['dynamed.consultation'].create({'patient_id': cls.patient.id})
+        cls.prescriptions = cls.env['dynamed.prescription'].create([
+            {'consultation_id': cls.consultation.id},
+            {'consultation_id': cls.consultation.id},
+        ])
+
+    def _sync_token(self, model_name):
+        """Jeton de delta obtenu après avoir lu toutes les pages"""
+        Model = self.env[model_name]
+        page = Model.get_sync_page()
+        while page['has_more']:
+            page = Model.get_sync_page(page['cursor'])
+        return page['cursor']
+
+    def test_unlink_creates_tombstones(self):
+        token = self._sync_token('dynamed.patient')
+        patient_id = self.patient.id
+        self.consultation.unlink()
+        self.patient.unlink()
+
+        page = self.env['dynamed.patient'].get_sync_page(token)
+        self.assertEqual(page['deleted'], [patient_id])
+        self.assertFalse(page['reset'])
+
+    def test_unlink_consultation_tombstones_cascaded_prescriptions(self):
+        prescription_token = self._sync_token('dynamed.prescription')
+        consultation_token = self._sync_token('dynamed.consultation')
+        prescription_ids = self.prescriptions.ids
+        consultation_id = self.consultation.id
+
+        # Les ordonnances sont supprimées en cascade par la base
+        self.consultation.unlink()
+        self.assertFalse(self.env['dynamed.prescription'].search([('id', 'in', prescription_ids)]))
+
+        page = self.env['dynamed.prescription'].get_sync_page(prescription_token)
+        self.assertEqual(sorted(page['deleted']), sorted(prescription_ids))
+        page = self.env['dynamed.consultation'].get_sync_page(consultation_token)
+        self.assertEqual(page['deleted'], [consultation_id])
+
+
+@tagged('post_install', '-at_install')
+class TestSyncController(HttpCase):
+
+    def test_unchanged_page_returns_304(self):
+        # Aucune écriture récente : le jeton (et donc l'ETag) ne dépend pas de l'heure de l'appel
+        self.authenticate('admin', 'admin')
+
+        response = self.url_open('/dynamed/sync/patients')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+        response = self.url_open('/dynamed/sync/patients', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.content)
+
+        response = self.url_open('/dynamed/sync/patients', headers={'If-None-Match': '"autre"'})
+        self.assertEqual(response.status_code, 200)
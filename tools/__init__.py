@@ -0,0 +1,5 @@
+from . import csv_stream
+from . import interaction_parse
+from . import file_stream
+from . import text_search
+from . import perf
@@ -0,0 +1,83 @@
+"""Lecture en flux des fichiers CSV importés (sans dépendance à Odoo)."""
+import base64
+import io
+import itertools
+
+# Taille des blocs lus dans le fichier source
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class CountingReader(io.RawIOBase):
+    """Flux binaire qui compte les octets lus dans le flux sous-jacent"""
+
+    def __init__(self, raw):
+        super().__init__()
+        self._raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        return size
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+class Base64Reader(io.RawIOBase):
+    """Flux binaire qui décode une valeur base64 bloc par bloc"""
+
+    def __init__(self, encoded, block_size=READ_BLOCK_SIZE):
+        super().__init__()
+        if isinstance(encoded, str):
+            encoded = encoded.encode()
+        self._encoded = memoryview(encoded)
+        self._position = 0
+        # Un bloc base64 doit contenir un multiple de 4 caractères
+        self._block_size = max(block_size - block_size % 4, 4)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self._pending) < len(buffer) and self._position < len(self._encoded):
+            block = self._encoded[self._position:self._position + self._block_size]
+            self._position += len(block)
+            self._pending += base64.b64decode(block)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def count_lines(raw):
+    """Nombre de fins de ligne du flux binaire ``raw`` (lu bloc par bloc, puis fermé)"""
+    with raw:
+        return sum(block.count(b'\n') for block in iter(lambda: raw.read(READ_BLOCK_SIZE), b''))
+
+
+def open_text(raw, encoding='utf-8'):
+    """Enveloppe un flux binaire brut dans un flux texte utilisable par le module csv"""
+    return io.TextIOWrapper(io.BufferedReader(raw, READ_BLOCK_SIZE), encoding=encoding, newline='')
+
+
+def iter_chunks(iterable, size=None):
+    """Découpe un itérable en listes de ``size`` éléments (une seule liste si ``size`` est vide)"""
+    iterator = iter(iterable)
+    if not size:
+        chunk = list(iterator)
+        if chunk:
+            yield chunk
+        return
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
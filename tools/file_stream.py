@@ -0,0 +1,28 @@
+"""Copie en flux des fichiers téléversés (sans dépendance à Odoo)."""
+import hashlib
+
+from .csv_stream import READ_BLOCK_SIZE
+
+
+class FileTooLarge(ValueError):
+    """Le fichier dépasse la taille maximale autorisée"""
+
+
+def copy_limited(source, target, max_size, block_size=READ_BLOCK_SIZE):
+    """
+    Copie ``source`` dans ``target`` bloc par bloc, en calculant l'empreinte SHA-1 du contenu.
+
+    Lève ``FileTooLarge`` dès que ``max_size`` octets sont dépassés, sans lire la suite.
+    Retourne ``(empreinte, taille)``.
+    """
+    digest = hashlib.sha1()
+    size = 0
+    while True:
+        block = source.read(block_size)
+        if not block:
+            return digest.hexdigest(), size
+        size += len(block)
+        if size > max_size:
+            raise FileTooLarge(size)
+        digest.update(block)
+        target.write(block)
@@ -0,0 +1,96 @@
+"""Analyse parallèle des fichiers d'interactions (sans dépendance à Odoo).
+
+Les lignes sont réduites à des tuples ``(médicament 1, classe, médicaments, type)``,
+réparties en fragments contigus, analysées dans un pool de processus, puis fusionnées
+dans l'ordre du fichier : la première occurrence d'une interaction l'emporte, comme
+lors d'un import ligne par ligne.
+
+Le pool est créé une fois par fichier (``interaction_parser``) et partagé par tous ses
+lots : c'est la taille du fichier, pas celle des lots, qui décide du parallélisme.
+"""
+import contextlib
+import functools
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# En dessous de ce nombre de lignes dans le fichier, le coût du pool dépasse le gain
+PARALLEL_MIN_ROWS = 20000
+
+_SEPARATORS = re.compile(r'(\s*-\s*|\s*,\s*)')
+
+
+def split_values(text):
+    """Sépare les valeurs selon différents séparateurs (virgules et tirets)"""
+    if not text:
+        return []
+
+    # Normaliser les séparateurs (remplacer les tirets par des virgules)
+    normalized_text = _SEPARATORS.sub('|', text.strip())
+    # Supprimer les espaces autour des pipes et filtrer les valeurs vides
+    return [v.strip() for v in normalized_text.split('|') if v.strip()]
+
+
+def parse_interaction_shard(rows):
+    """
+    Analyse un fragment de lignes ``(médicament 1, classe, médicaments, type)``.
+
+    Retourne ``(interactions, medicaments, classes)`` :
+    - ``interactions`` : {(médicament 1, médicament 2, classe): type}, sans doublon
+    - ``medicaments`` / ``classes`` : noms rencontrés, sans doublon, dans l'ordre du fichier
+    """
+    interactions = {}
+    medicaments = {}
+    classes = {}
+    for med1_name, class_name, med2_text, type_interaction in rows:
+        medicaments[med1_name] = None
+        if class_name:
+            classes[class_name] = None
+        for med2_name in split_values(med2_text):
+            medicaments[med2_name] = None
+            interactions.setdefault((med1_name, med2_name, class_name), type_interaction)
+    return interactions, list(medicaments), list(classes)
+
+
+def _shards(rows, count):
+    size = -(-len(rows) // count)
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+@contextlib.contextmanager
+def interaction_parser(workers=0, total_rows=0):
+    """
+    Fournit la fonction d'analyse des lots d'un fichier de ``total_rows`` lignes : en
+    parallèle sur ``workers`` processus (0 : un par CPU) quand le volume le justifie,
+    séquentielle sinon. Le pool est arrêté à la sortie du contexte.
+
+    Les processus sont créés par fork (les fils n'ont pas à réimporter Odoo et n'utilisent
+    pas la base) : l'appelant ne doit demander plusieurs processus que depuis un processus
+    sans autres threads, jamais depuis le serveur multi-thread.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or total_rows < PARALLEL_MIN_ROWS or 'fork' not in multiprocessing.get_all_start_methods():
+        yield parse_interactions
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        yield functools.partial(parse_interactions, pool=pool, workers=workers)
+
+
+def parse_interactions(rows, pool=None, workers=1):
+    """
+    Analyse les lignes, réparties en ``workers`` fragments sur ``pool`` s'il est donné,
+    et fusionne les fragments dans l'ordre.
+    """
+    if pool is not None and workers > 1 and len(rows) > 1:
+        results = list(pool.map(parse_interaction_shard, _shards(rows, workers)))
+    else:
+        results = [parse_interaction_shard(rows)]
+
+    interactions, medicaments, classes = {}, {}, {}
+    for shard_interactions, shard_medicaments, shard_classes in results:
+        for key, type_interaction in shard_interactions.items():
+            interactions.setdefault(key, type_interaction)
+        medicaments.update(dict.fromkeys(shard_medicaments))
+        classes.update(dict.fromkeys(shard_classes))
+    return interactions, list(medicaments), list(classes)
@@ -0,0 +1,97 @@
+"""Mesures de performance en mémoire et export au format Prometheus (sans dépendance à Odoo)."""
+import collections
+import contextvars
+import threading
+import time
+
+# Mesures en cours, de la plus externe à la plus interne
+_active = contextvars.ContextVar('dynamed_perf_active', default=())
+
+
+class SampleBuffer:
+    """
+    Tampon circulaire des mesures d'un processus : au-delà de ``maxlen`` mesures non
+    vidées, les plus anciennes sont perdues plutôt que de faire grossir la mémoire.
+    """
+
+    def __init__(self, maxlen):
+        self._samples = collections.deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.last_drain = time.monotonic()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def append(self, sample):
+        self._samples.append(sample)
+
+    def due(self, size, interval):
+        """Vrai si le tampon contient ``size`` mesures ou n'a pas été vidé depuis ``interval`` s"""
+        return bool(self._samples) and (
+            len(self._samples) >= size or time.monotonic() - self.last_drain >= interval
+        )
+
+    def drain(self):
+        """Retire et retourne toutes les mesures du tampon"""
+        with self._lock:
+            samples = list(self._samples)
+            self._samples.clear()
+            self.last_drain = time.monotonic()
+        return samples
+
+
+class measure:
+    """
+    Contexte de mesure d'un appel : temps écoulé, et données signalées pendant l'appel
+    par ``add_rows`` et ``mark_cache_hit``. ``sample`` est complété à la sortie.
+    """
+
+    def __init__(self, name):
+        self.sample = {'method': name, 'row_count': 0, 'cache_hit': False, 'failed': False}
+
+    def __enter__(self):
+        active = _active.get()
+        # Mesure la plus externe : c'est à sa sortie que le tampon peut être vidé
+        self.outermost = not active
+        self._token = _active.set(active + (self.sample,))
+        self._start = time.perf_counter()
+        return self.sample
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.sample['duration_ms'] = (time.perf_counter() - self._start) * 1000
+        self.sample['failed'] = exc_type is not None
+        _active.reset(self._token)
+        return False
+
+
+def add_rows(count):
+    """Ajoute ``count`` lignes traitées à la mesure en cours, s'il y en a une"""
+    active = _active.get()
+    if active:
+        active[-1]['row_count'] += count
+
+
+def mark_cache_hit():
+    """Signale que la mesure en cours a été servie par un cache"""
+    active = _active.get()
+    if active:
+        active[-1]['cache_hit'] = True
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_prometheus(metrics):
+    """
+    Texte d'exposition Prometheus de ``metrics`` : liste de (nom, type, aide, valeurs)
+    où valeurs est une liste de ({étiquette: valeur}, nombre).
+    """
+    lines = []
+    for name, metric_type, help_text, values in metrics:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in values:
+            label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in sorted(labels.items()))
+            lines.append(f'{name}{{{label_text}}} {value:g}' if label_text else f'{name} {value:g}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,19 @@
+"""Normalisation des noms pour la recherche (sans dépendance à Odoo)."""
+import re
+import unicodedata
+
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Clé de recherche d'un nom : sans accents, en minuscules, espaces réduits"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    unaccented = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _SPACES.sub(' ', unaccented.casefold()).strip()
+
+
+def escape_like(text):
+    """Échappe les caractères spéciaux d'un motif LIKE"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')